@@ -0,0 +1,52 @@
+import os
+import tempfile
+import tracemalloc
+from argparse import ArgumentParser
+
+from doxyfront import source
+
+_MEMBER_XML = '''<memberdef kind="function" id="classbench_1a{0}" prot="public" static="no" const="yes"
+    explicit="no" inline="no" virt="non-virtual">
+  <type><ref refid="classbench" kindref="compound">bench</ref> &amp;</type>
+  <definition>bench &amp; bench::method{0}</definition>
+  <name>method{0}</name>
+  <param><type>const std::string &amp;</type><declname>name</declname></param>
+  <param><type>int</type><declname>count</declname><defval>0</defval></param>
+  <briefdescription><para>Performs operation number {0}.</para></briefdescription>
+  <detaileddescription><para>Takes <computeroutput>name</computeroutput> and returns
+    <bold>*this</bold> for chaining.</para></detaileddescription>
+  <location file="include/bench.h" line="{0}"/>
+</memberdef>
+'''
+
+
+def _write_class(f, members: int):
+    f.write('<?xml version="1.0"?>\n<doxygen><compounddef id="classbench" kind="class" language="C++">\n')
+    f.write('<compoundname>bench</compoundname><sectiondef kind="public-func">\n')
+    for i in range(members):
+        f.write(_MEMBER_XML.format(i))
+    f.write('</sectiondef><location file="include/bench.h" line="1"/></compounddef></doxygen>\n')
+
+
+def measure(members: int) -> (int, int):
+    with tempfile.NamedTemporaryFile('w', suffix='.xml', delete=False) as f:
+        _write_class(f, members)
+    try:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        defs = source.Parser(f.name).parse()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+    finally:
+        os.unlink(f.name)
+    retained = sum(s.size_diff for s in after.compare_to(before, 'filename'))
+    return len(defs), retained
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser('benchmarks.model_memory')
+    parser.add_argument('--members', type=int, default=20000)
+    args = parser.parse_args()
+
+    n_defs, retained = measure(args.members)
+    print('{} defs, {} bytes retained, {:.0f} bytes/def'.format(n_defs, retained, retained / n_defs))
@@ -0,0 +1,52 @@
+import gc
+import multiprocessing
+import os
+import time
+from argparse import ArgumentParser
+
+from doxyfront import source
+
+
+def _parse_objects(file_name: str) -> [source.Def]:
+    return source.Parser(file_name).parse()
+
+
+def pool_map(files: [str]) -> [source.Def]:
+    with multiprocessing.Pool() as pool:
+        def_slices = pool.map(_parse_objects, files)
+    return [d for slice in def_slices for d in slice]
+
+
+def encoded(files: [str]) -> [source.Def]:
+    return source.parse(files)
+
+
+def _time(fn, files: [str], repeat: int) -> (float, int):
+    # The cyclic GC is paused for both paths alike (decode_slices() pauses it anyway), so that the
+    # comparison only measures how slices are transferred and rebuilt
+    best = None
+    n_defs = 0
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            n_defs = len(fn(files))
+            elapsed = time.perf_counter() - start
+        finally:
+            gc.enable()
+        best = elapsed if best is None else min(best, elapsed)
+    return best, n_defs
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser('benchmarks.parse_transfer')
+    parser.add_argument('xml-dir')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    xml_dir = args.__dict__['xml-dir']
+    files = [os.path.join(xml_dir, f) for f in os.listdir(xml_dir) if f.endswith('.xml')]
+    for fn in (pool_map, encoded):
+        seconds, n_defs = _time(fn, files, args.repeat)
+        print('{:10} {:8.3f}s  {} defs'.format(fn.__name__, seconds, n_defs))
@@ -0,0 +1,156 @@
+import contextlib
+import importlib.resources
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from doxyfront import source, doctree
+from doxyfront.model import IndexDef
+
+from . import synthetic
+
+
+def _peak_rss_kib(who: str = 'RUSAGE_SELF'):
+    # RUSAGE_CHILDREN covers the parse and render pool workers once they have exited, but only reports
+    # the largest of them
+    if resource is None:
+        return None
+    return resource.getrusage(getattr(resource, who)).ru_maxrss
+
+
+class _Report:
+    def __init__(self):
+        self.phases = []
+        self.warnings = 0
+
+    @contextlib.contextmanager
+    def phase(self, name: str, items: int = None, count_warnings: bool = False):
+        # Unresolved refs are part of the synthetic input by design, so their warnings are only counted
+        captured = io.StringIO()
+        start_cpu = time.process_time()
+        start = time.perf_counter()
+        with contextlib.redirect_stderr(captured) if count_warnings else contextlib.nullcontext():
+            yield
+        wall = time.perf_counter() - start
+        cpu = time.process_time() - start_cpu
+        self.warnings += captured.getvalue().count('\n')
+        self.phases.append({
+            'phase': name,
+            'wall_seconds': round(wall, 6),
+            'cpu_seconds': round(cpu, 6),
+            'items': items,
+            'items_per_second': round(items / wall, 1) if items and wall > 0 else None,
+            'peak_rss_kib': _peak_rss_kib(),
+            'worker_peak_rss_kib': _peak_rss_kib('RUSAGE_CHILDREN'),
+        })
+
+
+def run(xml_dir: str, out_dir: str) -> dict:
+    report = _Report()
+
+    with report.phase('list_files'):
+        files = [os.path.join(xml_dir, f) for f in sorted(os.listdir(xml_dir)) if f.endswith('.xml')]
+
+    with report.phase('parse', len(files)):
+        defs = source.parse(files)
+
+    # The passes of source.link, timed one by one
+    with report.phase('resolve_refs', len(defs), count_warnings=True):
+        source._resolve_refs(defs)
+    with report.phase('assign_parents', len(defs)):
+        for d in defs:
+            source._assign_parents(d)
+    with report.phase('unqualify_names', len(defs)):
+        source._unqualify_names(defs)
+    with report.phase('renew_ids', len(defs)):
+        source._renew_ids(defs)
+    with report.phase('assign_roots', len(defs)):
+        scope_root = IndexDef('index', 'Global Namespace')
+        file_root = IndexDef('file_index', 'Root Folder')
+        for d in defs:
+            source._assign_roots(d, scope_root, file_root)
+        defs += [scope_root, file_root]
+    with report.phase('derive_brief_description', len(defs)):
+        for d in defs:
+            source._derive_brief_description(d)
+
+    with report.phase('generate_hrefs', len(defs)):
+        doctree.generate_hrefs(defs)
+    pages = [d for d in defs if d.page is not None]
+
+    # Serial, so that preparation and template rendering can be told apart
+    template = doctree.load_template()
+    sibling_cache = doctree.SiblingCache()
+    prepare_seconds = 0
+    render_seconds = 0
+    with report.phase('prepare_and_render', len(pages)):
+        for d in pages:
+            start = time.perf_counter()
+            script = doctree.prepare_render(d, sibling_cache=sibling_cache)
+            prepared = time.perf_counter()
+            doctree.render_content(template, script)
+            render_seconds += time.perf_counter() - prepared
+            prepare_seconds += prepared - start
+    report.phases[-1]['prepare_render_seconds'] = round(prepare_seconds, 6)
+    report.phases[-1]['template_render_seconds'] = round(render_seconds, 6)
+    report.phases[-1]['sibling_cache_hits'] = sibling_cache.hits
+    report.phases[-1]['sibling_cache_misses'] = sibling_cache.misses
+
+    with report.phase('doctree', len(pages)):
+        doctree.doctree(defs, out_dir)
+
+    with report.phase('extract_assets'):
+        doctree._extract_assets(importlib.resources.files('doxyfront') / 'assets',
+                                os.path.join(out_dir, 'fresh-assets'))
+
+    return {
+        'files': len(files),
+        'defs': len(defs),
+        'pages': len(pages),
+        'warnings': report.warnings,
+        'peak_rss_kib': _peak_rss_kib(),
+        'worker_peak_rss_kib': _peak_rss_kib('RUSAGE_CHILDREN'),
+        'phases': report.phases,
+    }
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser('benchmarks.run')
+    parser.add_argument('--xml-dir', help='benchmark existing Doxygen XML instead of generating it')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    synthetic.add_arguments(parser)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='doxyfront-benchmark-')
+    try:
+        xml_dir = args.xml_dir
+        generate_seconds = None
+        if xml_dir is None:
+            xml_dir = os.path.join(work_dir, 'xml')
+            start = time.perf_counter()
+            synthetic.generate_from_args(xml_dir, args)
+            generate_seconds = round(time.perf_counter() - start, 6)
+
+        result = run(xml_dir, os.path.join(work_dir, 'html'))
+        result['generate_seconds'] = generate_seconds
+        if args.xml_dir is None:
+            result['parameters'] = dict((k, v) for k, v in vars(args).items() if k not in ('xml_dir', 'output'))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    else:
+        json.dump(result, sys.stdout, indent=2)
+        print()
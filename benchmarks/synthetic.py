@@ -0,0 +1,228 @@
+import hashlib
+import os
+import random
+from argparse import ArgumentParser
+from xml.sax.saxutils import escape, quoteattr
+
+_WORDS = ('the', 'value', 'returns', 'given', 'object', 'container', 'element', 'range', 'iterator',
+          'allocator', 'buffer', 'handle', 'stream', 'result', 'current', 'state', 'of', 'for', 'a')
+
+
+def _refid(kind: str, qualified_name: str) -> str:
+    refid = kind + qualified_name.replace('_', '__').replace('::', '_1_1').replace('/', '_2')
+    if len(refid) > 100:
+        # Like Doxygen, which falls back to a hash for names that would be too long as file names
+        refid = kind + '_' + hashlib.md5(refid.encode()).hexdigest()
+    return refid
+
+
+class _Generator:
+    def __init__(self, out_dir: str, namespaces: int, classes: int, members: int, depth: int,
+                 markup: int, include_fanout: int, unresolved_rate: float, seed: int):
+        self._out_dir = out_dir
+        self._n_namespaces = max(1, namespaces)
+        self._n_classes = classes
+        self._n_members = members
+        self._depth = max(1, depth)
+        self._markup = markup
+        self._include_fanout = include_fanout
+        self._unresolved_rate = unresolved_rate
+        self._random = random.Random(seed)
+        self._namespaces = []
+        self._classes = []
+        self._files = []
+
+    def _write(self, refid: str, body: str):
+        with open(os.path.join(self._out_dir, refid + '.xml'), 'w') as f:
+            f.write('<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n')
+            f.write('<doxygen version="1.8.17" xml:lang="en-US">\n')
+            f.write(body)
+            f.write('</doxygen>\n')
+
+    def _ref(self, refid: str, name: str) -> str:
+        if self._random.random() < self._unresolved_rate:
+            refid = 'external_' + refid
+        return '<ref refid="{}" kindref="compound">{}</ref>'.format(refid, escape(name))
+
+    def _type_ref(self) -> str:
+        if not self._classes:
+            return 'int'
+        refid, name, _ = self._random.choice(self._classes)
+        return self._ref(refid, name)
+
+    def _sentence(self) -> str:
+        words = [self._random.choice(_WORDS) for _ in range(self._random.randint(6, 14))]
+        words[self._random.randrange(len(words))] = '<computeroutput>{}</computeroutput>'.format(
+            self._random.choice(_WORDS))
+        return ' '.join(words).capitalize()
+
+    def _description(self, paragraphs: int) -> str:
+        body = []
+        for i in range(paragraphs):
+            text = '{} {}. {} <bold>{}</bold>.'.format(
+                self._sentence(), self._type_ref(), self._sentence(), self._random.choice(_WORDS))
+            if i == paragraphs - 1 and paragraphs > 1:
+                text += '<simplesect kind="note"><para>{}.</para></simplesect>'.format(self._sentence())
+            body.append('<para>{}</para>'.format(text))
+        return ''.join(body)
+
+    def _descriptions(self, paragraphs: int) -> str:
+        return '<briefdescription><para>{}.</para></briefdescription>\n' \
+               '<detaileddescription>{}</detaileddescription>\n'.format(
+            self._sentence(), self._description(paragraphs))
+
+    def _plan(self):
+        # Namespace i sits at nesting level i % depth below the most recent namespace one level up
+        last_at_level = []
+        for i in range(self._n_namespaces):
+            level = i % self._depth
+            parent = last_at_level[level - 1] if level > 0 else None
+            name = 'ns{}'.format(i)
+            qualified_name = parent[1] + '::' + name if parent else name
+            ns = (_refid('namespace', qualified_name), qualified_name, parent, [], [])
+            if parent:
+                parent[3].append(ns)
+            self._namespaces.append(ns)
+            last_at_level[level:] = [ns]
+
+        for i in range(self._n_classes):
+            ns = self._namespaces[i % len(self._namespaces)]
+            qualified_name = '{}::Class{}'.format(ns[1], i)
+            klass = (_refid('class', qualified_name), qualified_name, ns)
+            ns[4].append(klass)
+            self._classes.append(klass)
+            path = '{}/class{}.h'.format(ns[1].replace('::', '/'), i)
+            self._files.append((_refid('', path.replace('.', '_8')), path, klass))
+
+    def _member(self, class_refid: str, class_name: str, index: int) -> str:
+        refid = '{}_1a{:08x}'.format(class_refid, index)
+        location = '<location file="{}" line="{}"/>\n'.format(class_name.replace('::', '/') + '.h', 10 + index)
+        paragraphs = self._markup // 2
+        choice = index % 10
+        if choice < 7:
+            # Pairs of members share a name to produce overloads
+            params = ''.join('<param><type>const {} &amp;</type><declname>arg{}</declname></param>\n'.format(
+                self._type_ref(), p) for p in range(self._random.randint(0, 3)))
+            return '<memberdef kind="function" id="{}" prot="public" static="no" const="{}" explicit="no" ' \
+                   'inline="no" virt="non-virtual">\n<type>{}</type>\n<name>method{}</name>\n{}{}{}' \
+                   '</memberdef>\n'.format(refid, 'yes' if index % 3 == 0 else 'no', self._type_ref(),
+                                           index // 2, params, self._descriptions(paragraphs), location)
+        if choice < 8:
+            return '<memberdef kind="variable" id="{}" prot="private" static="no" mutable="no">\n' \
+                   '<type>{}</type>\n<name>member{}_</name>\n{}{}</memberdef>\n'.format(
+                refid, self._type_ref(), index, self._descriptions(paragraphs), location)
+        if choice < 9:
+            return '<memberdef kind="typedef" id="{}" prot="public" static="no">\n<type>{}</type>\n' \
+                   '<definition>using alias{} = {}</definition>\n<name>alias{}</name>\n{}{}</memberdef>\n'.format(
+                refid, self._type_ref(), index, 'T', index, self._descriptions(paragraphs), location)
+        values = ''.join('<enumvalue id="{}_1a{:08x}v{}" prot="public"><name>VALUE{}</name>'
+                         '<initializer>= {}</initializer><briefdescription></briefdescription>'
+                         '<detaileddescription></detaileddescription></enumvalue>\n'.format(refid, index, v, v, v)
+                         for v in range(3))
+        return '<memberdef kind="enum" id="{}" prot="public" static="no" strong="yes">\n<type>int</type>\n' \
+               '<name>Kind{}</name>\n{}{}{}</memberdef>\n'.format(
+            refid, index, values, self._descriptions(paragraphs), location)
+
+    def _write_namespace(self, ns):
+        refid, qualified_name, _, children, classes = ns
+        inner = ''.join('<innernamespace refid="{}">{}</innernamespace>\n'.format(c[0], escape(c[1]))
+                        for c in children)
+        inner += ''.join('<innerclass refid="{}" prot="public">{}</innerclass>\n'.format(c[0], escape(c[1]))
+                         for c in classes)
+        self._write(refid, '<compounddef id="{}" kind="namespace" language="C++">\n'
+                           '<compoundname>{}</compoundname>\n{}{}<location file="{}"/>\n</compounddef>\n'.format(
+            refid, escape(qualified_name), inner, self._descriptions(self._markup),
+            qualified_name.replace('::', '/')))
+
+    def _write_class(self, klass):
+        refid, qualified_name, _ = klass
+        members = ''.join(self._member(refid, qualified_name, i) for i in range(self._n_members))
+        bases = ''
+        if self._classes and self._random.random() < 0.3:
+            base_refid, base_name, _ = self._random.choice(self._classes)
+            bases = '<basecompoundref refid="{}" prot="public" virt="non-virtual">{}</basecompoundref>\n'.format(
+                base_refid, escape(base_name))
+        self._write(refid, '<compounddef id="{}" kind="class" language="C++" prot="public">\n'
+                           '<compoundname>{}</compoundname>\n{}<templateparamlist><param><type>typename</type>'
+                           '<declname>T</declname></param></templateparamlist>\n'
+                           '<sectiondef kind="public-func">\n{}</sectiondef>\n{}<location file="{}.h" line="1"/>\n'
+                           '</compounddef>\n'.format(refid, escape(qualified_name), bases, members,
+                                                     self._descriptions(self._markup),
+                                                     qualified_name.replace('::', '/')))
+
+    def _write_file(self, file):
+        refid, path, klass = file
+        includes = ''
+        for target in self._random.sample(self._files, min(self._include_fanout, len(self._files))):
+            includes += '<includes refid="{}" local="no">{}</includes>\n'.format(target[0], escape(target[1]))
+        includes += '<includes local="no">vector</includes>\n'
+        self._write(refid, '<compounddef id="{}" kind="file" language="C++">\n<compoundname>{}</compoundname>\n'
+                           '{}<innerclass refid="{}" prot="public">{}</innerclass>\n'
+                           '<briefdescription></briefdescription>\n<detaileddescription></detaileddescription>\n'
+                           '<location file="{}"/>\n</compounddef>\n'.format(
+            refid, escape(os.path.basename(path)), includes, klass[0], escape(klass[1]), escape(path)))
+
+    def _write_dirs(self):
+        dirs = dict()
+        for refid, path, _ in self._files:
+            parent = os.path.dirname(path)
+            dirs.setdefault(parent, ([], []))[1].append((refid, os.path.basename(path)))
+            while os.path.dirname(parent):
+                child, parent = parent, os.path.dirname(parent)
+                subdirs = dirs.setdefault(parent, ([], []))[0]
+                if child not in subdirs:
+                    subdirs.append(child)
+                else:
+                    break
+        for path, (subdirs, files) in dirs.items():
+            inner = ''.join('<innerdir refid="{}">{}</innerdir>\n'.format(_refid('dir_', d), escape(d))
+                            for d in subdirs)
+            inner += ''.join('<innerfile refid="{}">{}</innerfile>\n'.format(f, escape(n)) for f, n in files)
+            refid = _refid('dir_', path)
+            self._write(refid, '<compounddef id="{}" kind="dir">\n<compoundname>{}</compoundname>\n{}'
+                               '<briefdescription></briefdescription>\n<detaileddescription></detaileddescription>\n'
+                               '<location file={}/>\n</compounddef>\n'.format(
+                refid, escape(path), inner, quoteattr(path + '/')))
+
+    def generate(self):
+        os.makedirs(self._out_dir, exist_ok=True)
+        self._plan()
+        for ns in self._namespaces:
+            self._write_namespace(ns)
+        for klass in self._classes:
+            self._write_class(klass)
+        for file in self._files:
+            self._write_file(file)
+        self._write_dirs()
+
+
+def generate(out_dir: str, namespaces: int = 20, classes: int = 200, members: int = 20, depth: int = 3,
+             markup: int = 2, include_fanout: int = 5, unresolved_rate: float = 0.05, seed: int = 0):
+    _Generator(out_dir, namespaces, classes, members, depth, markup, include_fanout, unresolved_rate,
+               seed).generate()
+
+
+def add_arguments(parser: ArgumentParser):
+    parser.add_argument('--namespaces', type=int, default=20, help='total number of namespaces')
+    parser.add_argument('--classes', type=int, default=200, help='total number of classes')
+    parser.add_argument('--members', type=int, default=20, help='members per class')
+    parser.add_argument('--depth', type=int, default=3, help='namespace nesting depth')
+    parser.add_argument('--markup', type=int, default=2, help='paragraphs per detailed description')
+    parser.add_argument('--include-fanout', type=int, default=5, help='includes per file')
+    parser.add_argument('--unresolved-rate', type=float, default=0.05,
+                        help='fraction of refs pointing outside the project')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def generate_from_args(out_dir: str, args):
+    generate(out_dir, namespaces=args.namespaces, classes=args.classes, members=args.members,
+             depth=args.depth, markup=args.markup, include_fanout=args.include_fanout,
+             unresolved_rate=args.unresolved_rate, seed=args.seed)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser('benchmarks.synthetic')
+    parser.add_argument('out-dir')
+    add_arguments(parser)
+    args = parser.parse_args()
+    generate_from_args(args.__dict__['out-dir'], args)
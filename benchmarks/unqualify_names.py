@@ -0,0 +1,67 @@
+import os
+import tempfile
+import time
+from argparse import ArgumentParser
+
+from doxyfront import source
+from doxyfront.model import CompoundDef, ResolvedRef
+
+from . import synthetic
+
+
+def _recursive(d, prefix: str = ''):
+    # The previous implementation, called once per def: every call descends into all (transitive)
+    # members, so nested scopes are visited once per ancestor
+    if prefix and d.qualified_name.startswith(prefix):
+        d.name = d.qualified_name[len(prefix):]
+    if (not prefix or d.qualified_name.startswith(prefix)) and isinstance(d, CompoundDef):
+        prefix = d.qualified_name + '::'
+        for m in d.members:
+            if isinstance(m, ResolvedRef):
+                _recursive(m.definition, prefix)
+
+
+def recursive(defs):
+    for d in defs:
+        _recursive(d)
+    for d in defs:
+        if d.name is None:
+            d.name = d.qualified_name
+
+
+def single_pass(defs):
+    source._unqualify_names(defs)
+
+
+def _time(fn, defs, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(defs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser('benchmarks.unqualify_names')
+    parser.add_argument('--depths', type=int, nargs='+', default=[4, 16, 64, 256])
+    parser.add_argument('--classes', type=int, default=200)
+    parser.add_argument('--members', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for depth in args.depths:
+        with tempfile.TemporaryDirectory() as xml_dir:
+            # A single chain of depth nested namespaces, with the classes spread over all levels
+            synthetic.generate(xml_dir, namespaces=depth, classes=args.classes, members=args.members,
+                               depth=depth, unresolved_rate=0)
+            files = [os.path.join(xml_dir, f) for f in sorted(os.listdir(xml_dir)) if f.endswith('.xml')]
+            defs = source.parse(files)
+        source._resolve_refs(defs)
+        for d in defs:
+            source._assign_parents(d)
+
+        results = [(fn.__name__, _time(fn, defs, args.repeat)) for fn in (recursive, single_pass)]
+        print('depth {:4}  {} defs  {}'.format(depth, len(defs), '  '.join(
+            '{} {:8.3f}s'.format(name, seconds) for name, seconds in results)))
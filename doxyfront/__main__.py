@@ -1,15 +1,97 @@
+import functools
 import os
-from . import source, doctree
+import sys
+from . import archive, compress, source, doctree, profiling, snapshot, watch
 from argparse import ArgumentParser
 
 parser = ArgumentParser('doxyfront')
-parser.add_argument('xml-dir')
+parser.add_argument('xml-dir', nargs='?')
 parser.add_argument('output-dir')
+parser.add_argument('--cache-dir', help='reuse parsed XML files from this directory across runs')
+parser.add_argument('--save-model', metavar='FILE', help='save the resolved model to a snapshot file')
+parser.add_argument('--load-model', metavar='FILE', help='load the model from a snapshot instead of XML')
+parser.add_argument('--id-map', metavar='FILE',
+                    help='keep the output ids of all defs in this file to reuse them in the next build')
+parser.add_argument('--skip-unchanged', action='store_true',
+                    help='do not rewrite pages whose content is identical to the existing file')
+parser.add_argument('--compress', action='append', choices=['gzip', 'br'], metavar='ENCODING',
+                    help='also write pre-compressed siblings of every page and asset in this encoding '
+                         '(gzip or br, can be repeated)')
+parser.add_argument('--compress-all', action='store_true',
+                    help='like --compress for every available encoding')
+parser.add_argument('--incremental', action='store_true',
+                    help='only re-render pages whose inputs changed since the last build')
+parser.add_argument('--shared-nav', action='store_true',
+                    help='render the sibling navigation of each parent once and load it into pages client-side')
+parser.add_argument('--archive', action='store_true',
+                    help='write the site into a single archive named output-dir (.zip, .tar, .tar.gz, .tgz, '
+                         '.tar.bz2 or .tar.xz) instead of a directory')
+parser.add_argument('--watch', action='store_true',
+                    help='keep running and rebuild affected pages whenever XML files change')
+parser.add_argument('--interval', type=float, default=1.0, help='polling interval for --watch in seconds')
+parser.add_argument('--profile', nargs='?', const='-', metavar='FILE',
+                    help='report time, object counts, memory growth and peak RSS per build stage as JSON to '
+                         'FILE or stderr (with --watch, after every rebuild)')
+parser.add_argument('--profile-dump-dir', metavar='DIR',
+                    help='with --profile, write a cProfile dump per build stage to this directory')
+parser.add_argument('--profile-memory', action='store_true',
+                    help='with --profile, report the traced allocation peak per build stage and dump tracemalloc '
+                         'snapshots alongside the cProfile dumps')
 args = parser.parse_args()
 
 xml_dir = args.__dict__['xml-dir']
 output_dir = args.__dict__['output-dir']
-files = [os.path.join(xml_dir, f) for f in os.listdir(xml_dir) if f.endswith('.xml')]
-defs = source.load(files)
-os.makedirs(output_dir, exist_ok=True)
-doctree.doctree(defs, output_dir)
+encodings = ()
+if args.compress_all:
+    encodings = compress.available()
+elif args.compress is not None:
+    encodings = sorted(set(args.compress))
+    if 'br' in encodings and 'br' not in compress.available():
+        parser.error('--compress br requires the brotli package')
+if args.archive:
+    if not archive.is_archive(output_dir):
+        parser.error('--archive requires output-dir to end in .zip, .tar, .tar.gz, .tgz, .tar.bz2 or .tar.xz')
+    if args.skip_unchanged or args.incremental or args.watch:
+        parser.error('--archive cannot be combined with --skip-unchanged, --incremental or --watch')
+profile_file = None if args.profile in (None, '-') else args.profile
+if args.profile is not None:
+    profiling.enable(dump_dir=args.profile_dump_dir, trace_memory=args.profile_memory)
+if args.watch:
+    if xml_dir is None:
+        parser.error('--watch requires xml-dir')
+    on_rebuild = None
+    if args.profile is not None:
+        on_rebuild = functools.partial(profiling.write_report, profile_file, reset=True)
+    try:
+        watch.watch(xml_dir, output_dir, interval=args.interval, cache_dir=args.cache_dir,
+                    id_map_file=args.id_map, on_rebuild=on_rebuild, skip_unchanged=args.skip_unchanged,
+                    encodings=encodings, shared_nav=args.shared_nav)
+    except KeyboardInterrupt:
+        pass
+    sys.exit(0)
+
+if args.load_model is not None:
+    with profiling.stage('load_model'):
+        defs = snapshot.load(args.load_model)
+elif xml_dir is not None:
+    with profiling.stage('list_files'):
+        files = [os.path.join(xml_dir, f) for f in sorted(os.listdir(xml_dir)) if f.endswith('.xml')]
+    id_map = source.load_id_map(args.id_map) if args.id_map is not None else None
+    defs = source.load(files, cache_dir=args.cache_dir, id_map=id_map)
+    if args.id_map is not None:
+        source.save_id_map(defs, args.id_map)
+else:
+    parser.error('either xml-dir or --load-model is required')
+
+if args.save_model is not None:
+    with profiling.stage('save_model', len(defs)):
+        snapshot.save(defs, args.save_model)
+if args.archive:
+    doctree.doctree_archive(defs, output_dir, encodings=encodings, shared_nav=args.shared_nav)
+else:
+    os.makedirs(output_dir, exist_ok=True)
+    doctree.doctree(defs, output_dir, skip_unchanged=args.skip_unchanged,
+                    incremental_state=args.incremental, encodings=encodings, shared_nav=args.shared_nav)
+
+if args.profile is not None:
+    profiling.write_report(profile_file)
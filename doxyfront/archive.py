@@ -0,0 +1,83 @@
+import io
+import os
+import tarfile
+import time
+import zipfile
+from typing import Optional
+
+_TAR_MODES = (
+    ('.tar', 'w|'),
+    ('.tar.gz', 'w|gz'),
+    ('.tgz', 'w|gz'),
+    ('.tar.bz2', 'w|bz2'),
+    ('.tar.xz', 'w|xz'),
+)
+
+# Deflating these again only costs time
+_STORED_SUFFIXES = ('.gz', '.br', '.woff', '.woff2', '.png', '.jpg')
+
+
+def is_archive(file_name: str) -> bool:
+    return file_name.endswith('.zip') or any(file_name.endswith(s) for s, _ in _TAR_MODES)
+
+
+class ArchiveWriter:
+    # Streams entries into a zip or tar file, which only replaces file_name once it is complete
+    def __init__(self, file_name: str):
+        self._file_name = file_name
+        self._temp_file = file_name + '.tmp'
+        self._mtime = time.time()
+        self._zip = None
+        self._tar = None
+        if file_name.endswith('.zip'):
+            self._zip = zipfile.ZipFile(self._temp_file, 'w', zipfile.ZIP_DEFLATED)
+        else:
+            mode = next(m for s, m in _TAR_MODES if file_name.endswith(s))
+            self._tar = tarfile.open(self._temp_file, mode)
+
+    def write(self, path: str, data: bytes):
+        if self._zip is not None:
+            info = zipfile.ZipInfo(path, time.localtime(self._mtime)[:6])
+            # A bare ZipInfo extracts as 0600, which a web server running as another user cannot read
+            info.external_attr = 0o644 << 16
+            info.compress_type = zipfile.ZIP_STORED if path.endswith(_STORED_SUFFIXES) else zipfile.ZIP_DEFLATED
+            self._zip.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(path)
+            info.size = len(data)
+            info.mtime = self._mtime
+            self._tar.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        (self._zip or self._tar).close()
+        os.replace(self._temp_file, self._file_name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            (self._zip or self._tar).close()
+            os.remove(self._temp_file)
+
+
+class ArchiveReader:
+    def __init__(self, file_name: str):
+        self._zip = None
+        self._tar = None
+        if file_name.endswith('.zip'):
+            self._zip = zipfile.ZipFile(file_name)
+        else:
+            # Compressed tar files can only be read sequentially, so this is slow for .tar.gz and friends
+            self._tar = tarfile.open(file_name)
+            self._members = dict((m.name, m) for m in self._tar.getmembers() if m.isfile())
+
+    def read(self, path: str) -> Optional[bytes]:
+        try:
+            if self._zip is not None:
+                return self._zip.read(path)
+            return self._tar.extractfile(self._members[path]).read()
+        except KeyError:
+            return None
@@ -0,0 +1,12 @@
+// Called by the shared sibling nav scripts in nav/, each of which directly follows its placeholder
+function doxyfrontNav(html) {
+    var placeholder = document.currentScript.previousElementSibling;
+    placeholder.innerHTML = html;
+    var self = placeholder.getAttribute('data-self');
+    var items = placeholder.querySelectorAll('li[data-id]');
+    for (var i = 0; i < items.length; ++i) {
+        if (items[i].getAttribute('data-id') === self) {
+            items[i].className = 'self';
+        }
+    }
+}
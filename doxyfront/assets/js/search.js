@@ -0,0 +1,139 @@
+var doxyfrontSearch = (function () {
+    var MAX_RESULTS = 30;
+    var MAX_SHARDS = 8;
+    var kinds = [];
+    var keys = [];
+    var shards = {};
+    var input = null;
+    var results = null;
+
+    // Must match shard_key() in doxyfront/search.py
+    function shardKey(name) {
+        return name.toLowerCase().replace(/[^a-z0-9_]/g, '-');
+    }
+
+    // Shards that can contain names starting with the given one. Returns null if the name is too
+    // short to narrow the search down to a handful of shards.
+    function shardsFor(name) {
+        var key = shardKey(name);
+        var needed = keys.filter(function (k) {
+            return k.slice(0, key.length) === key || key.slice(0, k.length) === k;
+        });
+        return needed.length <= MAX_SHARDS ? needed : null;
+    }
+
+    function loadShard(key) {
+        if (shards[key] !== undefined) {
+            return;
+        }
+        shards[key] = null;
+        var script = document.createElement('script');
+        script.src = 'search/s_' + key + '.js';
+        document.head.appendChild(script);
+    }
+
+    function lowerBound(keys, prefix) {
+        var lo = 0, hi = keys.length;
+        while (lo < hi) {
+            var mid = (lo + hi) >> 1;
+            if (keys[mid] < prefix) {
+                lo = mid + 1;
+            } else {
+                hi = mid;
+            }
+        }
+        return lo;
+    }
+
+    function resultItem(entry) {
+        var item = document.createElement('li');
+        var link = document.createElement('a');
+        link.href = entry[3];
+        link.className = 'ref ref-' + kinds[entry[2]];
+        link.textContent = entry[1] || entry[0];
+        item.appendChild(link);
+        item.title = (entry[1] || entry[0]) + (entry[4] ? ' – ' + entry[4] : '');
+        return item;
+    }
+
+    function show(entries) {
+        results.textContent = '';
+        entries.forEach(function (entry) {
+            results.appendChild(resultItem(entry));
+        });
+    }
+
+    function update() {
+        var query = input.value.trim().toLowerCase();
+        if (query === '') {
+            show([]);
+            return;
+        }
+
+        // "ns::na" looks up names starting with "na" whose qualified name contains "ns::na"
+        var separator = query.lastIndexOf('::');
+        var name = separator >= 0 ? query.slice(separator + 2) : query;
+        var needed = name !== '' ? shardsFor(name) : null;
+        if (needed === null) {
+            show([]);
+            return;
+        }
+        needed.forEach(loadShard);
+        if (needed.some(function (k) { return shards[k] === null; })) {
+            // update() runs again once the shards have arrived
+            return;
+        }
+
+        var matches = [];
+        needed.forEach(function (k) {
+            var shard = shards[k];
+            for (var i = lowerBound(shard.keys, name); i < shard.keys.length; ++i) {
+                if (shard.keys[i].slice(0, name.length) !== name) {
+                    break;
+                }
+                var entry = shard.entries[i];
+                if (name === query || (entry[1] || entry[0]).toLowerCase().indexOf(query) >= 0) {
+                    matches.push(entry);
+                }
+            }
+        });
+        matches.sort(function (a, b) {
+            var x = a[0].toLowerCase(), y = b[0].toLowerCase();
+            return x < y ? -1 : x > y ? 1 : a[1] < b[1] ? -1 : a[1] > b[1] ? 1 : 0;
+        });
+        show(matches.slice(0, MAX_RESULTS));
+    }
+
+    function init(kindNames, shardKeys) {
+        kinds = kindNames;
+        keys = shardKeys;
+        if (input !== null && input.value !== '') {
+            update();
+        }
+    }
+
+    function load(key, entries) {
+        shards[key] = {
+            keys: entries.map(function (e) { return e[0].toLowerCase(); }),
+            entries: entries
+        };
+        if (input !== null) {
+            update();
+        }
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        var box = document.getElementById('search');
+        if (box === null) {
+            return;
+        }
+        input = box.querySelector('input');
+        results = box.querySelector('ul');
+        input.addEventListener('input', update);
+        var script = document.createElement('script');
+        script.src = 'search/index.js';
+        document.head.appendChild(script);
+    });
+
+    return {init: init, load: load};
+})();
@@ -0,0 +1,76 @@
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+# Already compressed formats such as fonts gain nothing from another pass
+_COMPRESSIBLE_SUFFIXES = ('.html', '.css', '.js', '.svg', '.json', '.txt')
+
+
+def _gzip(data: bytes) -> bytes:
+    # A fixed mtime keeps the output reproducible, which --skip-unchanged relies on
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data: bytes) -> bytes:
+    return brotli.compress(data)
+
+
+_ENCODINGS = {
+    'gzip': ('.gz', _gzip),
+    'br': ('.br', _brotli),
+}
+
+
+def available() -> [str]:
+    return [e for e in _ENCODINGS if e != 'br' or brotli is not None]
+
+
+def _compressible(path: str) -> bool:
+    return path.endswith(_COMPRESSIBLE_SUFFIXES)
+
+
+def sibling_paths(path: str, encodings: [str]) -> [str]:
+    if not _compressible(path):
+        return []
+    return [path + _ENCODINGS[e][0] for e in encodings]
+
+
+def siblings(path: str, data: bytes, encodings: [str]) -> [(str, bytes)]:
+    if not _compressible(path):
+        return []
+    return [(path + _ENCODINGS[e][0], _ENCODINGS[e][1](data)) for e in encodings]
+
+
+def remove_stale_siblings(path: str, encodings: [str]):
+    # Siblings of encodings no longer requested would still hold the content of an earlier build
+    for p in sibling_paths(path, [e for e in _ENCODINGS if e not in encodings]):
+        try:
+            os.remove(p)
+        except FileNotFoundError:
+            pass
+
+
+def write_siblings(path: str, data: bytes, encodings: [str]):
+    for sibling_path, compressed in siblings(path, data, encodings):
+        with open(sibling_path, 'wb') as f:
+            f.write(compressed)
+    remove_stale_siblings(path, encodings)
+
+
+def siblings_exist(path: str, encodings: [str]) -> bool:
+    return all(os.path.exists(p) for p in sibling_paths(path, encodings))
+
+
+def remove_with_siblings(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    remove_stale_siblings(path, ())
@@ -1,13 +1,20 @@
+import filecmp
+import importlib.resources
 import multiprocessing
+import json
 import os
-from collections import defaultdict
+import posixpath
+import sys
+import threading
+import time
+from collections import defaultdict, OrderedDict
 import shutil
-import pkg_resources
 
 import jinja2
 
 from .__init__ import __version__ as package_version
 from .model import *
+from . import archive, compress, incremental, profiling, search
 
 
 class SymbolCategory(Enum):
@@ -93,26 +100,71 @@ def sorted_categories(members_by_cat: dict) -> (list, int):
     return [cat for _, cat in all_cats]
 
 
-def sibling_cats(parent: Def, context: set, cache: dict) -> (list, int):
-    try:
-        return cache[parent.id]
-    except KeyError:
+def _sibling_summary(m: Def) -> dict:
+    vis = m.visibility if isinstance(m.scope_parent, ClassDef) else None
+    return {
+        'definition': m,
+        'id': m.id,
+        'full_name_plaintext': m.qualified_name_plaintext(set()),
+        'full_signature_plaintext': m.signature_plaintext(set()),
+        'vis_order': '+~#-'.index(vis.value) if vis else 0,
+    }
+
+
+class SiblingCache:
+    # The sorted and truncated member lists of the most recently used parents. Entries do not depend
+    # on the page being rendered; names relative to a page's context are filled in by sibling_cats().
+    # Entries keep their defs alive, so a cache must not outlive the model it was filled from.
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, parent: Def) -> list:
+        try:
+            cats = self._entries[parent]
+        except KeyError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(parent)
+            return cats
+
         by_cat = defaultdict(list)
         assert isinstance(parent, CompoundDef)
         for ref in parent.members:
             if isinstance(ref, ResolvedRef):
                 m = ref.definition
-                by_cat[category(m)].append(describe(m, context))
+                by_cat[category(m)].append(_sibling_summary(m))
         cats = [(n, m[:30], max(0, len(m) - 30)) for n, m in sorted_categories(by_cat)]
-        cache[parent.id] = cats
+        self._entries[parent] = cats
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
         return cats
 
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def sibling_cats(parent: Def, context: set, cache: SiblingCache) -> (list, int):
+    return [(n, [dict(s, name_html=s['definition'].qualified_name_html(context)) for s in siblings], overflow)
+            for n, siblings, overflow in cache.get(parent)]
 
-scope_sibling_cache = dict()
-path_sibling_cache = dict()
 
+def _nav_path(kind: str, parent: Def) -> str:
+    return 'nav/{}-{}.js'.format(kind, parent.id)
 
-def prepare_render(definition: Def) -> dict:
+
+def prepare_render(definition: Def, shared_nav: bool = False,
+                   sibling_cache: Optional[SiblingCache] = None) -> dict:
+    if sibling_cache is None:
+        sibling_cache = SiblingCache()
     context = set()
     details = None
     include = None
@@ -135,14 +187,20 @@ def prepare_render(definition: Def) -> dict:
         members_by_cat[category(m)].append(describe(m, context))
 
     scope_sibling_cats = None
+    scope_sibling_nav = None
     if definition is not None and definition.scope_parent:
-        global scope_sibling_cache
-        scope_sibling_cats = sibling_cats(definition.scope_parent, context, scope_sibling_cache)
+        if shared_nav:
+            scope_sibling_nav = _nav_path('scope', definition.scope_parent)
+        else:
+            scope_sibling_cats = sibling_cats(definition.scope_parent, context, sibling_cache)
 
     path_sibling_cats = None
+    path_sibling_nav = None
     if definition is not None and definition.file_parent:
-        global path_sibling_cache
-        path_sibling_cats = sibling_cats(definition.file_parent, context, path_sibling_cache)
+        if shared_nav:
+            path_sibling_nav = _nav_path('path', definition.file_parent)
+        else:
+            path_sibling_cats = sibling_cats(definition.file_parent, context, sibling_cache)
 
     window_title = definition.signature_plaintext(context, fully_qualified=True)
     template_sig, signature = definition.signature_html(context, fully_qualified=True)
@@ -159,6 +217,8 @@ def prepare_render(definition: Def) -> dict:
         'member_cats': sorted_categories(members_by_cat),
         'scope_sibling_cats': scope_sibling_cats,
         'path_sibling_cats': path_sibling_cats,
+        'scope_sibling_nav': scope_sibling_nav,
+        'path_sibling_nav': path_sibling_nav,
         'include': include,
     }
 
@@ -166,27 +226,274 @@ def prepare_render(definition: Def) -> dict:
 _LEADING_WHITESPACE_RE = re.compile(r'^\s+', re.MULTILINE)
 
 
-def render(path: str, script: dict):
-    with open(path, 'w') as f:
-        global template
-        f.write(_LEADING_WHITESPACE_RE.sub('', template.render(**script)))
+def _file_matches(path: str, data: bytes) -> bool:
+    try:
+        with open(path, 'rb') as f:
+            return f.read() == data
+    except OSError:
+        return False
 
 
-def render_one(params):
-    render(*params)
+def render_content(template: jinja2.Template, script: dict) -> str:
+    return _LEADING_WHITESPACE_RE.sub('', template.render(**script))
 
 
-def _extract_assets(manager, provider, src_resource, dest_folder):
+def render(path: str, script: dict, skip_unchanged: bool = False, encodings: [str] = ()) -> bool:
+    global template
+    data = render_content(template, script).encode('utf-8')
+    # Leaving identical pages untouched preserves their mtime for rsync-style uploads
+    if skip_unchanged and _file_matches(path, data) and compress.siblings_exist(path, encodings):
+        compress.remove_stale_siblings(path, encodings)
+        return False
+    with open(path, 'wb') as f:
+        f.write(data)
+    # Compressed siblings are written from memory, by the render worker that produced the page
+    compress.write_siblings(path, data, encodings)
+    return True
+
+
+# Set by doctree() before forking the render pool, so that workers inherit the model instead of
+# receiving pickled render contexts
+_pages: [Def] = []
+_outdir: Optional[str] = None
+_skip_unchanged = False
+_encodings: [str] = ()
+_archive = False
+_shared_nav = False
+_sibling_cache: Optional[SiblingCache] = None
+
+
+def _render_page(index: int) -> (bool, float, float, [(str, bytes)]):
+    d = _pages[index]
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    script = prepare_render(d, _shared_nav, _sibling_cache)
+    prepare_seconds = time.perf_counter() - start
+    prepare_cpu = time.process_time() - start_cpu
+    if _archive:
+        # The page and its compressed siblings are handed back to the process writing the archive
+        data = render_content(template, script).encode('utf-8')
+        return True, prepare_seconds, prepare_cpu, [(d.page, data)] + compress.siblings(d.page, data, _encodings)
+    written = render(os.path.join(_outdir, d.page), script, _skip_unchanged, _encodings)
+    return written, prepare_seconds, prepare_cpu, []
+
+
+def _render_batch(indices: [int]) -> (int, float, int, int, float, float, [(str, bytes)]):
+    start = time.perf_counter()
+    written = 0
+    prepare_seconds = 0
+    prepare_cpu = 0
+    entries = []
+    for i in indices:
+        w, s, c, e = _render_page(i)
+        written += w
+        prepare_seconds += s
+        prepare_cpu += c
+        entries += e
+    return os.getpid(), time.perf_counter() - start, len(indices), written, prepare_seconds, prepare_cpu, entries
+
+
+def _markup_size(markup: Optional[Markup]) -> int:
+    if markup is None:
+        return 0
+    size = 0
+    stack = [markup.root]
+    while stack:
+        fragment = stack.pop()
+        size += 1
+        stack.extend(fragment.children)
+    return size
+
+
+def _render_cost(d: Def) -> int:
+    # Rough relative cost of a page: every member is described, markup is rendered in full, and
+    # sibling lists are built once per parent and worker
+    cost = 10 + _markup_size(d.detailed_description)
+    if isinstance(d, CompoundDef):
+        cost += 10 * len(d.members)
+    for parent in (d.scope_parent, d.file_parent):
+        if isinstance(parent, CompoundDef):
+            cost += len(parent.members)
+    return cost
+
+
+# Together with the window of 4 batches per worker, this bounds the number of pages in flight
+_MAX_BATCH_PAGES = 32
+
+
+def _batches(pages: [Def], processes: int):
+    # Largest pages first, in batches of decreasing total cost (guided self-scheduling): expensive
+    # pages start early and the cheap tail is spread evenly over all workers.
+    costs = [_render_cost(d) for d in pages]
+    order = sorted(range(len(pages)), key=costs.__getitem__, reverse=True)
+    remaining = sum(costs)
+    batch = []
+    batch_cost = 0
+    for i in order:
+        batch.append(i)
+        batch_cost += costs[i]
+        if batch_cost >= remaining / (2 * processes) or len(batch) == _MAX_BATCH_PAGES:
+            yield batch
+            remaining -= batch_cost
+            batch = []
+            batch_cost = 0
+    if batch:
+        yield batch
+
+
+class _Progress:
+    def __init__(self, total: int, what: str):
+        self._total = total
+        self._what = what
+        self._done = 0
+        self._tty = sys.stderr.isatty()
+        self._interval = 0.5 if self._tty else 10
+        self._last = time.monotonic()
+
+    def update(self, n: int = 1):
+        self._done += n
+        now = time.monotonic()
+        if now - self._last >= self._interval or self._done == self._total:
+            self._last = now
+            line = '{}/{} {}'.format(self._done, self._total, self._what)
+            if self._tty:
+                end = '\n' if self._done == self._total else ''
+                print('\r' + line, end=end, file=sys.stderr, flush=True)
+            else:
+                print(line, file=sys.stderr)
+
+
+def _windowed(jobs, window: threading.Semaphore, stop: threading.Event):
+    # Consumed by the pool's task feeder thread: blocks until the consumer has collected enough
+    # results, so the number of in-flight jobs stays bounded regardless of the number of pages.
+    for job in jobs:
+        window.acquire()
+        if stop.is_set():
+            return
+        yield job
+
+
+def _render_pages(pages: [Def], writer: Optional[archive.ArchiveWriter] = None) -> int:
+    progress = _Progress(len(pages), 'pages rendered')
+    written = 0
+    # Preparation time is summed over all pages (and thus workers) to be reported as its own stage
+    prepare_seconds = 0
+    prepare_cpu = 0
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        for i in range(len(pages)):
+            w, s, c, entries = _render_page(i)
+            for path, data in entries:
+                writer.write(path, data)
+            written += w
+            prepare_seconds += s
+            prepare_cpu += c
+            progress.update()
+        profiling.record('prepare_render', prepare_seconds, prepare_cpu, len(pages))
+        return written
+
+    processes = os.cpu_count() or 1
+    window = threading.Semaphore(4 * processes)
+    stop = threading.Event()
+    busy = defaultdict(float)
+    start = time.perf_counter()
+    with multiprocessing.get_context('fork').Pool(processes) as pool:
+        try:
+            for pid, seconds, n_rendered, n_written, s, c, entries in pool.imap_unordered(
+                    _render_batch, _windowed(_batches(pages, processes), window, stop)):
+                window.release()
+                for path, data in entries:
+                    writer.write(path, data)
+                busy[pid] += seconds
+                written += n_written
+                prepare_seconds += s
+                prepare_cpu += c
+                progress.update(n_rendered)
+        finally:
+            stop.set()
+            window.release()
+    wall = time.perf_counter() - start
+    profiling.record('prepare_render', prepare_seconds, prepare_cpu, len(pages), workers=len(busy))
+
+    if busy and wall > 0:
+        print('Render worker utilisation: {}'.format(', '.join(
+            '{:.0%}'.format(b / wall) for b in sorted(busy.values(), reverse=True))), file=sys.stderr)
+    return written
+
+
+def _extract_assets(src_resource, dest_folder: str, encodings: [str] = ()):
     os.makedirs(dest_folder, exist_ok=True)
-    for entry in provider.resource_listdir(src_resource):
-        entry_resource = '/'.join((src_resource, entry))
-        entry_folder = os.path.join(dest_folder, entry)
-        if provider.resource_isdir(entry_resource):
-            _extract_assets(manager, provider, entry_resource, entry_folder)
+    for entry in src_resource.iterdir():
+        entry_folder = os.path.join(dest_folder, entry.name)
+        if entry.is_dir():
+            _extract_assets(entry, entry_folder, encodings)
         else:
-            with provider.get_resource_stream(manager, entry_resource) as source:
-                with open(entry_folder, 'wb') as dest:
-                    dest.write(source.read())
+            with importlib.resources.as_file(entry) as source:
+                # copy2 preserves the mtime, so unchanged assets are recognized by a stat() next time
+                changed = not os.path.exists(entry_folder) or not filecmp.cmp(source, entry_folder) \
+                    or not compress.siblings_exist(entry_folder, encodings)
+                if changed:
+                    shutil.copy2(source, entry_folder)
+                if changed and compress.sibling_paths(entry_folder, encodings):
+                    compress.write_siblings(entry_folder, entry.read_bytes(), encodings)
+                else:
+                    compress.remove_stale_siblings(entry_folder, encodings)
+
+
+def _archive_assets(src_resource, prefix: str, writer: archive.ArchiveWriter, encodings: [str] = ()):
+    for entry in src_resource.iterdir():
+        path = prefix + entry.name
+        if entry.is_dir():
+            _archive_assets(entry, path + '/', writer, encodings)
+        else:
+            data = entry.read_bytes()
+            writer.write(path, data)
+            for sibling_path, compressed in compress.siblings(path, data, encodings):
+                writer.write(sibling_path, compressed)
+
+
+def nav_fragments(pages: [Def], template: jinja2.Template, sibling_cache: SiblingCache) -> dict:
+    # The sibling nav of every parent, rendered once instead of on each of its children's pages. The
+    # fragments are scripts so that pages can include them when opened from the file system, too.
+    parents = dict()
+    for d in pages:
+        if d.scope_parent:
+            parents[_nav_path('scope', d.scope_parent)] = ('Siblings by scope:', d.scope_parent)
+        if d.file_parent:
+            parents[_nav_path('path', d.file_parent)] = ('Siblings by path:', d.file_parent)
+
+    siblings_template = template.environment.get_template('siblings.html')
+    fragments = dict()
+    for path, (title, parent) in parents.items():
+        # Names are qualified relative to the parent, not to any particular child
+        context = set()
+        scope = parent
+        while scope is not None:
+            context.add(scope)
+            scope = scope.scope_parent
+        html = _LEADING_WHITESPACE_RE.sub('', siblings_template.render(
+            title=title, cats=sibling_cats(parent, context, sibling_cache), overflow_href=parent.href, shared=True))
+        fragments[path] = 'doxyfrontNav({});\n'.format(json.dumps(html))
+    return fragments
+
+
+def _write_files(outdir: str, sub_dir: str, files: dict, encodings: [str] = ()):
+    # Writes generated files below sub_dir, leaving unchanged ones untouched and removing stale ones
+    os.makedirs(os.path.join(outdir, sub_dir), exist_ok=True)
+    expected = set(files)
+    for path in files:
+        expected.update(compress.sibling_paths(path, encodings))
+    for name in os.listdir(os.path.join(outdir, sub_dir)):
+        if posixpath.join(sub_dir, name) not in expected:
+            os.remove(os.path.join(outdir, sub_dir, name))
+
+    for path, content in files.items():
+        file_name = os.path.join(outdir, *path.split('/'))
+        data = content.encode('utf-8')
+        if _file_matches(file_name, data) and compress.siblings_exist(file_name, encodings):
+            continue
+        with open(file_name, 'wb') as f:
+            f.write(data)
+        compress.write_siblings(file_name, data, encodings)
 
 
 def _generate_href(d: Def):
@@ -200,26 +507,121 @@ def _generate_href(d: Def):
         d.href = d.page
 
 
-def doctree(defs: [Def], outdir: str):
+def generate_hrefs(defs: [Def]):
+    for d in defs:
+        _generate_href(d)
+    # Cached names embed hrefs, but computing hrefs does not read names
+    invalidate_names()
+
+
+def load_template() -> jinja2.Template:
     env = jinja2.Environment(
         loader=jinja2.PackageLoader('doxyfront'),
         autoescape=jinja2.select_autoescape(['html']),
         trim_blocks=True,
     )
-    global template
-    template = env.get_template('doctree.html')
+    return env.get_template('doctree.html')
+
+
+def _archive_files(writer: archive.ArchiveWriter, files: dict, encodings: [str] = ()):
+    for path, content in files.items():
+        data = content.encode('utf-8')
+        writer.write(path, data)
+        for sibling_path, compressed in compress.siblings(path, data, encodings):
+            writer.write(sibling_path, compressed)
+
+
+def _template_sources(template: jinja2.Template) -> str:
+    env = template.environment
+    return '\0'.join(env.loader.get_source(env, name)[0] for name in (template.name, 'siblings.html'))
 
-    render_jobs = []
-    for d in defs:
-        _generate_href(d)
-        if d.page is not None:
-            script = prepare_render(d)
-            render_jobs.append((os.path.join(outdir, d.page), script))
+
+def doctree(defs: [Def], outdir: str, skip_unchanged: bool = False, incremental_state: bool = False,
+            encodings: [str] = (), shared_nav: bool = False):
+    global template
+    template = load_template()
+
+    with profiling.stage('generate_hrefs', len(defs)):
+        generate_hrefs(defs)
+    pages = [d for d in defs if d.page is not None]
+    all_pages = pages
+
+    if incremental_state:
+        old_state = incremental.load_state(outdir)
+        new_state = dict()
+        # Pages with shared sibling navs do not depend on their siblings, but this is not worth the
+        # complexity of a separate fingerprint
+        fingerprinter = incremental.Fingerprinter('{}\0{}\0{}\0{}'.format(
+            package_version, _template_sources(template), ','.join(encodings), shared_nav))
+        outdated = []
+        for d in pages:
+            fp = fingerprinter.page_fp(d)
+            new_state[d.page] = fp
+            if old_state.get(d.page) != fp or not os.path.exists(os.path.join(outdir, d.page)):
+                outdated.append(d)
+        print('{} of {} pages up to date'.format(len(pages) - len(outdated), len(pages)), file=sys.stderr)
+        pages = outdated
+        # Pages of removed or renamed defs would otherwise linger, unlike in a full build
+        for page in old_state:
+            if page not in new_state:
+                compress.remove_with_siblings(os.path.join(outdir, page))
 
     os.makedirs(outdir, exist_ok=True)
-    with multiprocessing.Pool() as pool:
-        pool.map(render_one, render_jobs)
+    # One cache per build, so that nothing keeps the defs of earlier builds alive in watch mode
+    sibling_cache = SiblingCache()
+    global _pages, _outdir, _skip_unchanged, _encodings, _shared_nav, _sibling_cache
+    _pages, _outdir, _skip_unchanged = pages, outdir, skip_unchanged
+    _encodings, _shared_nav, _sibling_cache = encodings, shared_nav, sibling_cache
+    try:
+        with profiling.stage('render_pages', len(pages)):
+            written = _render_pages(pages)
+    finally:
+        _pages, _outdir, _sibling_cache = [], None, None
+
+    if skip_unchanged:
+        print('{} pages written, {} unchanged'.format(written, len(pages) - written), file=sys.stderr)
+
+    if incremental_state:
+        incremental.save_state(outdir, new_state)
 
-    manager = pkg_resources.ResourceManager()
-    provider = pkg_resources.get_provider('doxyfront')
-    _extract_assets(manager, provider, 'assets', outdir)
+    if shared_nav:
+        with profiling.stage('nav_fragments', len(all_pages)):
+            _write_files(outdir, 'nav', nav_fragments(all_pages, template, sibling_cache), encodings)
+
+    with profiling.stage('search_index', len(defs)):
+        _write_files(outdir, 'search', search.index_files(defs), encodings)
+
+    with profiling.stage('extract_assets'):
+        _extract_assets(importlib.resources.files('doxyfront') / 'assets', outdir, encodings)
+
+
+def doctree_archive(defs: [Def], file_name: str, encodings: [str] = (), shared_nav: bool = False):
+    # Like doctree(), but streams all pages, the search index and the assets into a single zip or tar
+    # file instead of a directory of small files
+    global template
+    template = load_template()
+
+    with profiling.stage('generate_hrefs', len(defs)):
+        generate_hrefs(defs)
+    pages = [d for d in defs if d.page is not None]
+
+    sibling_cache = SiblingCache()
+    with archive.ArchiveWriter(file_name) as writer:
+        global _pages, _encodings, _archive, _shared_nav, _sibling_cache
+        _pages, _encodings, _archive = pages, encodings, True
+        _shared_nav, _sibling_cache = shared_nav, sibling_cache
+        try:
+            with profiling.stage('render_pages', len(pages)):
+                _render_pages(pages, writer)
+        finally:
+            _pages, _archive, _sibling_cache = [], False, None
+
+        if shared_nav:
+            with profiling.stage('nav_fragments', len(pages)):
+                _archive_files(writer, nav_fragments(pages, template, sibling_cache), encodings)
+
+        with profiling.stage('search_index', len(defs)):
+            _archive_files(writer, search.index_files(defs), encodings)
+
+        with profiling.stage('extract_assets'):
+            _archive_assets(importlib.resources.files('doxyfront') / 'assets', '', writer, encodings)
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+
+from .model import *
+
+_STATE_FILE = '.doxyfront-pages.json'
+
+
+def _hash(*parts: str) -> str:
+    return hashlib.blake2b('\0'.join(parts).encode(), digest_size=16).hexdigest()
+
+
+def _canonicalize(value, out: [str], refs: [Def]):
+    # Serializes model state deterministically (unlike pickle, which depends on object identity and
+    # set iteration order), replacing every referenced def by its id and collecting it in refs.
+    if value is None or isinstance(value, (str, int, float, Enum)):
+        out.append(repr(value))
+    elif isinstance(value, Def):
+        out.append('@' + value.id)
+        refs.append(value)
+    elif isinstance(value, (list, tuple)):
+        out.append('[')
+        for v in value:
+            _canonicalize(v, out, refs)
+        out.append(']')
+    elif isinstance(value, (set, frozenset)):
+        out.append('{')
+        for v in sorted(value, key=repr):
+            _canonicalize(v, out, refs)
+        out.append('}')
+    else:
+        out.append(type(value).__name__ + '(')
+        for name in slot_names(type(value)):
+            if not name.startswith('_'):
+                _canonicalize(getattr(value, name, None), out, refs)
+        out.append(')')
+
+
+# A page shows its own def, the summaries of its members and of its scope and path siblings, and the
+# names and hrefs of every def reachable through parents or references from those. Fingerprints of
+# these parts are memoized per def, so fingerprinting all pages is linear in the model size.
+class Fingerprinter:
+    def __init__(self, salt: str):
+        self._salt = salt
+        self._named = dict()
+        self._content = dict()
+        self._siblings = dict()
+
+    def _named_fp(self, d: Def) -> str:
+        # Everything needed to render a (qualified) name or path of d
+        try:
+            return self._named[d]
+        except KeyError:
+            fp = _hash('n', d.id, str(d.name), str(d.kind()), str(d.href),
+                       self._named_fp(d.scope_parent) if d.scope_parent is not None else '',
+                       self._named_fp(d.file_parent) if d.file_parent is not None else '')
+            self._named[d] = fp
+            return fp
+
+    def _content_fp(self, d: Def) -> str:
+        # Everything needed to render d itself or its summary on another page. Members are covered
+        # separately, since only d's own page lists them.
+        try:
+            return self._content[d]
+        except KeyError:
+            out = [type(d).__name__]
+            refs = []
+            for name in slot_names(type(d)):
+                if name != 'members' and not name.startswith('_'):
+                    _canonicalize(getattr(d, name, None), out, refs)
+            fp = _hash('c', self._named_fp(d), *out, *(self._named_fp(r) for r in refs))
+            self._content[d] = fp
+            return fp
+
+    def _siblings_fp(self, parent: Def) -> str:
+        try:
+            return self._siblings[parent]
+        except KeyError:
+            fp = _hash('s', self._named_fp(parent), *self._members_fps(parent))
+            self._siblings[parent] = fp
+            return fp
+
+    def _members_fps(self, d: Def) -> [str]:
+        if not isinstance(d, CompoundDef):
+            return []
+        return [self._content_fp(m.definition) if isinstance(m, ResolvedRef) else '-' for m in d.members]
+
+    def page_fp(self, d: Def) -> str:
+        return _hash('p', self._salt, self._content_fp(d), *self._members_fps(d),
+                     self._siblings_fp(d.scope_parent) if d.scope_parent is not None else '',
+                     self._siblings_fp(d.file_parent) if d.file_parent is not None else '')
+
+
+def load_state(outdir: str) -> dict:
+    try:
+        with open(os.path.join(outdir, _STATE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return dict()
+
+
+def save_state(outdir: str, state: dict):
+    temp_file = os.path.join(outdir, _STATE_FILE + '.tmp')
+    with open(temp_file, 'w') as f:
+        json.dump(state, f)
+    os.replace(temp_file, os.path.join(outdir, _STATE_FILE))
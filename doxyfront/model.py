@@ -4,11 +4,15 @@ import re
 from typing import Dict, Optional
 
 
-def _warning(msg: str, file_name: str):
-    print('{}: {}'.format(file_name, msg), file=sys.stderr)
+def _warning(msg: str, file_name: Optional[str] = None):
+    if file_name is not None:
+        msg = '{}: {}'.format(file_name, msg)
+    print(msg, file=sys.stderr)
 
 
 class Item:
+    __slots__ = ()
+
     def resolve_refs(self, defs: dict):
         pass
 
@@ -18,6 +22,18 @@ def _maybe_resolve_refs(item: Optional[Item], defs: dict):
         item.resolve_refs(defs)
 
 
+_slot_names_cache = dict()
+
+
+def slot_names(cls) -> tuple:
+    try:
+        return _slot_names_cache[cls]
+    except KeyError:
+        names = tuple(n for c in reversed(cls.__mro__) for n in c.__dict__.get('__slots__', ()))
+        _slot_names_cache[cls] = names
+        return names
+
+
 def _html_escape(s: str) -> str:
     return s.replace('&', '&amp;') \
         .replace('<', '&lt;') \
@@ -27,6 +43,8 @@ def _html_escape(s: str) -> str:
 
 
 class Fragment(Item):
+    __slots__ = ('children',)
+
     def __init__(self):
         self.children: [Fragment] = []
 
@@ -40,10 +58,21 @@ class Fragment(Item):
     def render_html(self, context) -> str:
         return ' '.join(c.render_html(context) for c in self.children)
 
+    def compile_html(self, chunks: list):
+        # Appends the static HTML of this fragment as strings, and every def whose name depends on
+        # the render context as the def itself
+        for i, c in enumerate(self.children):
+            if i > 0:
+                chunks.append(' ')
+            c.compile_html(chunks)
+
 
 class TextFragment(Fragment):
+    __slots__ = ('text',)
+
     def __init__(self, text: Optional[str] = None):
-        super().__init__()
+        # Text is always a leaf, so all instances share one empty children tuple instead of a list each
+        self.children = ()
         self.text = text
 
     def render_plaintext(self, context) -> str:
@@ -52,6 +81,9 @@ class TextFragment(Fragment):
     def render_html(self, context) -> str:
         return _html_escape(self.text)
 
+    def compile_html(self, chunks: list):
+        chunks.append(_html_escape(self.text))
+
 
 class FormatFragment(Fragment):
     @unique
@@ -64,6 +96,8 @@ class FormatFragment(Fragment):
         ENUMERATE = 'ol'
         ITEM = 'li'
 
+    __slots__ = ('variant',)
+
     def __init__(self, variant: Variant):
         super().__init__()
         self.variant = variant
@@ -71,8 +105,15 @@ class FormatFragment(Fragment):
     def render_html(self, context) -> str:
         return '<{0}>{1}</{0}>'.format(self.variant.value.lower(), super().render_html(context))
 
+    def compile_html(self, chunks: list):
+        chunks.append('<{}>'.format(self.variant.value.lower()))
+        super().compile_html(chunks)
+        chunks.append('</{}>'.format(self.variant.value.lower()))
+
 
 class RefFragment(Fragment):
+    __slots__ = ('ref',)
+
     def __init__(self, ref: Optional['Ref'] = None):
         super().__init__()
         self.ref = ref
@@ -83,12 +124,20 @@ class RefFragment(Fragment):
             return self.ref.definition.qualified_name_html(context)
         return content
 
+    def compile_html(self, chunks: list):
+        if isinstance(self.ref, ResolvedRef):
+            chunks.append(self.ref.definition)
+        else:
+            super().compile_html(chunks)
+
     def resolve_refs(self, defs: dict):
         super().resolve_refs(defs)
         self.ref = self.ref.resolve(defs)
 
 
 class LinkFragment(Fragment):
+    __slots__ = ('url',)
+
     def __init__(self, url: Optional[str] = None):
         super().__init__()
         self.url = url
@@ -96,8 +145,15 @@ class LinkFragment(Fragment):
     def render_html(self, context) -> str:
         return '<a class="external" href="{}">{}</a>'.format(self.url, super().render_html(context))
 
+    def compile_html(self, chunks: list):
+        chunks.append('<a class="external" href="{}">'.format(self.url))
+        super().compile_html(chunks)
+        chunks.append('</a>')
+
 
 class SectionFragment(Fragment):
+    __slots__ = ('kind',)
+
     def __init__(self, kind: str):
         super().__init__()
         self.kind = kind
@@ -105,25 +161,75 @@ class SectionFragment(Fragment):
     def render_html(self, context) -> str:
         return '<section><h3>{}</h3>{}</section>'.format(self.kind, super().render_html(context))
 
+    def compile_html(self, chunks: list):
+        chunks.append('<section><h3>{}</h3>'.format(self.kind))
+        super().compile_html(chunks)
+        chunks.append('</section>')
+
 
 _SUPERFLUOUS_WHITESPACE_RE = re.compile(r'(^\s+)|(?<=[\s(])\s+|\s+(?=[.,)])|(\s+$)')
 
 
+def _compile_html(root: Fragment) -> tuple:
+    chunks = []
+    root.compile_html(chunks)
+    # Runs of static chunks are joined, so that rendering only has to fill in the context-dependent refs
+    compiled = []
+    run = []
+    for c in chunks:
+        if isinstance(c, str):
+            run.append(c)
+        else:
+            if run:
+                compiled.append(''.join(run))
+                run = []
+            compiled.append(c)
+    if run:
+        compiled.append(''.join(run))
+    return tuple(compiled)
+
+
 class Markup(Item):
+    # The same briefs and types are rendered on every page listing their def, so both renderings are
+    # cached: plaintext does not depend on the context, and HTML is compiled into static chunks
+    # interleaved with the defs whose qualified names do.
+    __slots__ = ('root', '_plaintext', '_html_chunks')
+
     def __init__(self):
         self.root = Fragment()
+        self._plaintext: Optional[str] = None
+        self._html_chunks: Optional[tuple] = None
+
+    def __getstate__(self):
+        return self.root
+
+    def __setstate__(self, root: Fragment):
+        self.root = root
+        self._plaintext = None
+        self._html_chunks = None
 
     def resolve_refs(self, defs: dict):
         self.root.resolve_refs(defs)
+        self._plaintext = None
+        self._html_chunks = None
 
     def render_plaintext(self, context):
-        return _SUPERFLUOUS_WHITESPACE_RE.sub('', self.root.render_plaintext(context))
+        if self._plaintext is None:
+            self._plaintext = _SUPERFLUOUS_WHITESPACE_RE.sub('', self.root.render_plaintext(context))
+        return self._plaintext
 
     def render_html(self, context):
-        return self.root.render_html(context)
+        if self._html_chunks is None:
+            self._html_chunks = _compile_html(self.root)
+        chunks = self._html_chunks
+        if len(chunks) == 1 and isinstance(chunks[0], str):
+            return chunks[0]
+        return ''.join(c if isinstance(c, str) else c.qualified_name_html(context) for c in chunks)
 
 
 class Location:
+    __slots__ = ('file', 'line')
+
     def __init__(self):
         self.file: Optional[str] = None
         self.line: Optional[int] = None
@@ -173,13 +279,15 @@ def cpp_order_attributes(attrs: [Attribute]) -> ([Attribute], [Attribute]):
 
 
 class SingleDef:
-    pass
+    __slots__ = ()
 
 
 _NON_SLUG_CHARS = re.compile('[^a-z-]+')
 
 
 class SymbolDef:
+    __slots__ = ()
+
     def slug(self):
         assert isinstance(self, Def)
         slug = self.name.lower()
@@ -191,6 +299,8 @@ class SymbolDef:
 
 
 class PathDef:
+    __slots__ = ()
+
     def slug(self):
         assert isinstance(self, Def)
         slug = self.name.lower()
@@ -201,9 +311,24 @@ class PathDef:
         return _NON_SLUG_CHARS.sub('', slug)
 
 
+# Rendered names embed the hrefs of all defs on the scope or file chain. Instead of tracking which names
+# contain which hrefs, assigning any href starts a new generation and invalidates all cached names.
+_names_generation = object()
+
+
+def invalidate_names():
+    global _names_generation
+    _names_generation = object()
+
+
 class Def(Item):
+    __slots__ = ('id', 'refid', 'name', 'qualified_name', 'brief_description', 'detailed_description',
+                 'in_body_text', 'location', 'visibility', 'attributes', 'page', 'href', 'file_parent',
+                 'scope_parent', '_names', '_names_generation')
+
     def __init__(self):
         self.id: Optional[str] = None
+        self.refid: Optional[str] = None
         self.name: Optional[str] = None
         self.qualified_name: Optional[str] = None
         self.brief_description: Optional[Markup] = None
@@ -216,6 +341,8 @@ class Def(Item):
         self.href: Optional[str] = None
         self.file_parent: Optional[Def] = None
         self.scope_parent: Optional[Def] = None
+        self._names: Optional[dict] = None
+        self._names_generation: Optional[object] = None
 
     def kind(self) -> Optional[str]:
         raise NotImplementedError()
@@ -235,42 +362,76 @@ class Def(Item):
             return repr + ' ' + self.qualified_name
         return repr
 
-    def qualified_name_plaintext(self, context: set):
+    def _name_cache(self) -> dict:
+        if self._names_generation is not _names_generation:
+            self._names = dict()
+            self._names_generation = _names_generation
+        return self._names
+
+    def _scope_cutoff(self, context: set) -> Optional['Def']:
+        # The first scope parent not to be spelled out, which makes the cache key for qualified names
         scope_parent = self.scope_parent
-        text = ''
         while scope_parent is not None and not isinstance(scope_parent, IndexDef) \
                 and scope_parent not in context:
-            text = '::'.join((scope_parent.name, text))
             scope_parent = scope_parent.scope_parent
-        return text + self.name
+        return scope_parent
+
+    def _qualified_name_plaintext(self, cutoff: Optional['Def']) -> str:
+        cache = self._name_cache()
+        key = ('qualified_name_plaintext', cutoff)
+        try:
+            return cache[key]
+        except KeyError:
+            text = self.name
+            if self.scope_parent is not cutoff:
+                text = '::'.join((self.scope_parent._qualified_name_plaintext(cutoff), text))
+            cache[key] = text
+            return text
+
+    def _qualified_name_html(self, cutoff: Optional['Def']) -> str:
+        cache = self._name_cache()
+        key = ('qualified_name_html', cutoff)
+        try:
+            return cache[key]
+        except KeyError:
+            html = '<a class="ref ref-{}" href="{}">{}</a>'.format(self.kind(), self.href, self.name)
+            if self.scope_parent is not cutoff:
+                html = '{}<span class="scope">::</span>{}'.format(
+                    self.scope_parent._qualified_name_html(cutoff), html)
+            cache[key] = html
+            return html
+
+    def qualified_name_plaintext(self, context: set):
+        return self._qualified_name_plaintext(self._scope_cutoff(context))
 
     def qualified_name_html(self, context: set):
-        scope_parent = self.scope_parent
-        html = ''
-        while scope_parent is not None and not isinstance(scope_parent, IndexDef) \
-                and scope_parent not in context:
-            html = '<a class="ref ref-{}" href="{}">{}</a><span class="scope">::</span>'.format(
-                scope_parent.kind(), scope_parent.href, scope_parent.name) + html
-            scope_parent = scope_parent.scope_parent
-        return '{}<a class="ref ref-{}" href="{}">{}</a>'.format(
-            html, self.kind(), self.href, self.name)
+        return self._qualified_name_html(self._scope_cutoff(context))
 
     def path_plaintext(self, short=False):
-        file_parent = self.file_parent
-        text = self.name
-        while not short and file_parent is not None and not isinstance(file_parent, IndexDef):
-            text = '{}/{}'.format(file_parent.name, text)
-            file_parent = file_parent.file_parent
-        return text
+        cache = self._name_cache()
+        key = ('path_plaintext', short)
+        try:
+            return cache[key]
+        except KeyError:
+            text = self.name
+            file_parent = self.file_parent
+            if not short and file_parent is not None and not isinstance(file_parent, IndexDef):
+                text = '{}/{}'.format(file_parent.path_plaintext(), text)
+            cache[key] = text
+            return text
 
     def path_html(self, short=False):
-        file_parent = self.file_parent
-        html = '<a class="ref ref-{}" href="{}">{}</a>'.format(self.kind(), self.href, self.name)
-        while not short and file_parent is not None and not isinstance(file_parent, IndexDef):
-            html = '<a class="ref ref-{}" href="{}">{}</a>/{}'.format(
-                file_parent.kind(), file_parent.href, file_parent.name, html)
-            file_parent = file_parent.file_parent
-        return html
+        cache = self._name_cache()
+        key = ('path_html', short)
+        try:
+            return cache[key]
+        except KeyError:
+            html = '<a class="ref ref-{}" href="{}">{}</a>'.format(self.kind(), self.href, self.name)
+            file_parent = self.file_parent
+            if not short and file_parent is not None and not isinstance(file_parent, IndexDef):
+                html = '{}/{}'.format(file_parent.path_html(), html)
+            cache[key] = html
+            return html
 
     def signature_html(self, context, fully_qualified=False):
         if isinstance(self, PathDef):
@@ -288,11 +449,15 @@ class Def(Item):
 
 
 class Ref:
+    __slots__ = ()
+
     def resolve(self, defs: Dict[str, Def]) -> 'Ref':
         return self
 
 
 class SymbolicRef(Ref):
+    __slots__ = ('id', 'name')
+
     def __init__(self, id: str, name: Optional[str]):
         self.id = id
         self.name = name
@@ -306,16 +471,22 @@ class SymbolicRef(Ref):
 
 
 class UnresolvedRef(Ref):
+    __slots__ = ('name',)
+
     def __init__(self, name: str):
         self.name = name
 
 
 class ResolvedRef(Ref):
+    __slots__ = ('definition',)
+
     def __init__(self, definition: Def):
         self.definition = definition
 
 
 class Include(Item):
+    __slots__ = ('file', 'local')
+
     def __init__(self):
         self.file: Optional[Ref] = None
         self.local: Optional[bool] = None
@@ -326,6 +497,8 @@ class Include(Item):
 
 
 class MacroDef(Def, SingleDef, SymbolDef):
+    __slots__ = ('params', 'substitution')
+
     def __init__(self):
         super().__init__()
         self.params = []
@@ -352,6 +525,8 @@ class MacroDef(Def, SingleDef, SymbolDef):
 
 
 class TypedefDef(Def, SingleDef, SymbolDef):
+    __slots__ = ('template_params', 'type', 'definition')
+
     def __init__(self):
         super().__init__()
         self.template_params: [Param] = []
@@ -391,6 +566,8 @@ class TypedefDef(Def, SingleDef, SymbolDef):
 
 
 class Param(Item):
+    __slots__ = ('name', 'type', 'default')
+
     def __init__(self):
         self.name: Optional[str] = None
         self.type: Optional[Markup] = None
@@ -423,6 +600,8 @@ class FunctionDef(Def, SingleDef, SymbolDef):
         CONSTRUCTOR = 3
         DESTRUCTOR = 4
 
+    __slots__ = ('return_type', 'template_params', 'parameters', 'variant')
+
     def __init__(self):
         super().__init__()
         self.return_type: Optional[Markup] = None
@@ -474,6 +653,8 @@ class FunctionDef(Def, SingleDef, SymbolDef):
 
 
 class VariableDef(Def, SingleDef, SymbolDef):
+    __slots__ = ('type', 'initializer')
+
     def __init__(self):
         super().__init__()
         self.type = None
@@ -512,6 +693,8 @@ class VariableDef(Def, SingleDef, SymbolDef):
 
 # stub
 class PropertyDef(Def, SingleDef, SymbolDef):
+    __slots__ = ('type',)
+
     def __init__(self):
         super().__init__()
         self.type = None
@@ -528,6 +711,8 @@ class PropertyDef(Def, SingleDef, SymbolDef):
 
 
 class FriendDef(Def, SingleDef, SymbolDef):
+    __slots__ = ('template_params', 'definition')
+
     def __init__(self):
         super().__init__()
         self.template_params: [Param] = []
@@ -556,6 +741,8 @@ class FriendDef(Def, SingleDef, SymbolDef):
 
 
 class CompoundDef(Def):
+    __slots__ = ('language', 'members')
+
     def __init__(self):
         super().__init__()
         self.language: Optional[str] = None
@@ -568,6 +755,8 @@ class CompoundDef(Def):
 
 
 class EnumVariantDef(Def, SingleDef, SymbolDef):
+    __slots__ = ('initializer',)
+
     def __init__(self):
         super().__init__()
         self.initializer = None
@@ -596,6 +785,8 @@ class EnumVariantDef(Def, SingleDef, SymbolDef):
 
 
 class EnumDef(CompoundDef, SingleDef, SymbolDef):
+    __slots__ = ('underlying_type', 'strong')
+
     def __init__(self):
         super().__init__()
         self.underlying_type = None
@@ -629,6 +820,8 @@ class EnumDef(CompoundDef, SingleDef, SymbolDef):
 
 
 class DirectoryDef(CompoundDef, SingleDef, PathDef):
+    __slots__ = ()
+
     def kind(self) -> Optional[str]:
         return 'directory'
 
@@ -637,6 +830,8 @@ class DirectoryDef(CompoundDef, SingleDef, PathDef):
 
 
 class FileDef(CompoundDef, SingleDef, PathDef):
+    __slots__ = ('includes',)
+
     def __init__(self):
         super().__init__()
         self.includes: [Include] = []
@@ -654,6 +849,8 @@ class FileDef(CompoundDef, SingleDef, PathDef):
 
 
 class NamespaceDef(CompoundDef, SymbolDef):
+    __slots__ = ()
+
     def kind(self) -> Optional[str]:
         return 'namespace'
 
@@ -662,6 +859,8 @@ class NamespaceDef(CompoundDef, SymbolDef):
 
 
 class GroupDef(CompoundDef):
+    __slots__ = ()
+
     def kind(self) -> Optional[str]:
         return 'group'
 
@@ -671,6 +870,8 @@ class GroupDef(CompoundDef):
 
 # Stub
 class PageDef(CompoundDef):
+    __slots__ = ()
+
     def kind(self) -> Optional[str]:
         return 'page'
 
@@ -679,6 +880,8 @@ class PageDef(CompoundDef):
 
 
 class Inheritance(Item):
+    __slots__ = ('ref', 'visibility', 'virtual')
+
     def __init__(self):
         self.ref: Optional[Ref] = None
         self.visibility: Optional[Visibility] = None
@@ -699,6 +902,8 @@ class ClassDef(CompoundDef, SymbolDef, SingleDef):
         INTERFACE = 4
         CATEGORY = 5
 
+    __slots__ = ('template_params', 'bases', 'variant')
+
     def __init__(self):
         super().__init__()
         self.template_params: [Param] = []
@@ -743,6 +948,8 @@ class ClassDef(CompoundDef, SymbolDef, SingleDef):
 
 
 class IndexDef(CompoundDef):
+    __slots__ = ()
+
     def __init__(self, id: str, name: str):
         super().__init__()
         self.id = id
@@ -0,0 +1,129 @@
+import contextlib
+import cProfile
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Optional
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# None while profiling is disabled, so that stages cost nothing in regular builds
+_stages: Optional[list] = None
+_dump_dir: Optional[str] = None
+
+
+def _peak_rss_kib(who: str = 'RUSAGE_SELF') -> Optional[int]:
+    if resource is None:
+        return None
+    return resource.getrusage(getattr(resource, who)).ru_maxrss
+
+
+def _rss_kib() -> Optional[int]:
+    # The current RSS, which unlike the peak can also shrink; only available on Linux
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _traced_kib() -> Optional[int]:
+    if not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.get_traced_memory()[0] // 1024
+
+
+def _delta(before: Optional[int], after: Optional[int]) -> Optional[int]:
+    return after - before if before is not None and after is not None else None
+
+
+def enable(dump_dir: Optional[str] = None, trace_memory: bool = False):
+    global _stages, _dump_dir
+    _stages = []
+    _dump_dir = dump_dir
+    if dump_dir is not None:
+        os.makedirs(dump_dir, exist_ok=True)
+    if trace_memory:
+        tracemalloc.start()
+
+
+def enabled() -> bool:
+    return _stages is not None
+
+
+def record(name: str, wall: float, cpu: float, items: Optional[int] = None, **extra):
+    if _stages is None:
+        return
+    entry = {
+        'stage': name,
+        'wall_seconds': round(wall, 6),
+        'cpu_seconds': round(cpu, 6),
+        'items': items,
+        # Live allocations of the object allocator: a cheap stand-in for the number of objects, which
+        # gc.get_objects() could only count in O(heap)
+        'allocated_blocks': sys.getallocatedblocks(),
+        'peak_rss_kib': _peak_rss_kib(),
+    }
+    if tracemalloc.is_tracing():
+        entry['traced_peak_kib'] = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.reset_peak()
+    entry.update(extra)
+    _stages.append(entry)
+
+
+@contextlib.contextmanager
+def stage(name: str, items: Optional[int] = None):
+    if _stages is None:
+        yield
+        return
+
+    profiler = None
+    if _dump_dir is not None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    start_blocks = sys.getallocatedblocks()
+    start_rss = _rss_kib()
+    start_traced = _traced_kib()
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - start
+        cpu = time.process_time() - start_cpu
+        memory = {
+            'allocated_blocks_delta': sys.getallocatedblocks() - start_blocks,
+            'rss_delta_kib': _delta(start_rss, _rss_kib()),
+        }
+        if start_traced is not None:
+            memory['traced_delta_kib'] = _delta(start_traced, _traced_kib())
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(os.path.join(_dump_dir, '{:02}-{}.prof'.format(len(_stages), name)))
+            if tracemalloc.is_tracing():
+                tracemalloc.take_snapshot().dump(
+                    os.path.join(_dump_dir, '{:02}-{}.tracemalloc'.format(len(_stages), name)))
+        record(name, wall, cpu, items, **memory)
+
+
+def write_report(file_name: Optional[str] = None, reset: bool = False):
+    # For the parse and render workers, only the peak RSS of the largest one is known. With reset,
+    # stages recorded so far are dropped, so that each watch cycle reports only its own.
+    report = {
+        'stages': list(_stages or []),
+        'peak_rss_kib': _peak_rss_kib(),
+        'worker_peak_rss_kib': _peak_rss_kib('RUSAGE_CHILDREN'),
+    }
+    if reset and _stages is not None:
+        del _stages[:]
+    if file_name is None:
+        json.dump(report, sys.stderr, indent=2)
+        print(file=sys.stderr)
+    else:
+        with open(file_name, 'w') as f:
+            json.dump(report, f, indent=2)
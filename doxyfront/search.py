@@ -0,0 +1,65 @@
+import json
+import posixpath
+from collections import defaultdict
+
+from .model import *
+
+_SEARCH_DIR = 'search'
+_MANIFEST = 'index.js'
+_SHARD_KEY_CHARS = frozenset('abcdefghijklmnopqrstuvwxyz0123456789_')
+_SHARD_SIZE = 1000
+_MAX_SHARD_KEY_LENGTH = 8
+_BRIEF_LENGTH = 100
+
+
+def shard_key(name: str, length: int) -> str:
+    # Must match shardKey() in assets/js/search.js
+    return ''.join(c if c in _SHARD_KEY_CHARS else '-' for c in name[:length].lower())
+
+
+def _shard_file(key: str) -> str:
+    # The prefix keeps keys like "con" or "nul" from becoming reserved file names on Windows
+    return posixpath.join(_SEARCH_DIR, 's_{}.js'.format(key))
+
+
+def _entry(d: Def, kinds: dict) -> list:
+    qualified_name = d.qualified_name_plaintext(set())
+    brief = d.brief_description.render_plaintext(set()) if d.brief_description else ''
+    if len(brief) > _BRIEF_LENGTH:
+        brief = brief[:_BRIEF_LENGTH - 1] + '…'
+    kind = kinds.setdefault(d.kind(), len(kinds))
+    # Fields: name, qualified name (empty if equal to name), kind index, href, brief
+    return [d.name, qualified_name if qualified_name != d.name else '', kind, d.href, brief]
+
+
+def _shard(entries: [list], length: int, shards: dict):
+    # Shards are split by ever longer name prefixes until they are small enough. Names no longer than
+    # the prefix end up in a shard of their own, keyed by the full name.
+    by_key = defaultdict(list)
+    for e in entries:
+        by_key[shard_key(e[0], length)].append(e)
+    for key, group in by_key.items():
+        if len(group) > _SHARD_SIZE and len(key) == length < _MAX_SHARD_KEY_LENGTH:
+            _shard(group, length + 1, shards)
+        else:
+            shards[key] = group
+
+
+def index_files(defs: [Def]) -> dict:
+    # A manifest lists all shard keys; a query only needs the shards whose key is a prefix of the
+    # query or vice versa. Shards are sorted by lower-case name so that the client can binary-search
+    # a prefix, and are JSONP-style scripts so that search also works for sites opened from disk.
+    kinds = dict()
+    entries = [_entry(d, kinds) for d in defs if d.href is not None and d.name and not isinstance(d, IndexDef)]
+    shards = dict()
+    _shard(entries, 1, shards)
+
+    files = dict()
+    for key, group in shards.items():
+        group.sort(key=lambda e: (e[0].lower(), e[1]))
+        files[_shard_file(key)] = 'doxyfrontSearch.load({},{});\n'.format(
+            json.dumps(key), json.dumps(group, ensure_ascii=False, separators=(',', ':')))
+    files[posixpath.join(_SEARCH_DIR, _MANIFEST)] = 'doxyfrontSearch.init({},{});\n'.format(
+        json.dumps(sorted(kinds, key=kinds.get), separators=(',', ':')),
+        json.dumps(sorted(shards), separators=(',', ':')))
+    return files
@@ -0,0 +1,138 @@
+import functools
+import importlib.resources
+import mimetypes
+import os
+import posixpath
+import sys
+from argparse import ArgumentParser
+from http import HTTPStatus
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from typing import Optional
+from urllib.parse import unquote, urlsplit
+
+from . import archive, source, doctree, search, snapshot
+from .model import *
+
+
+class _Site:
+    def __init__(self, defs: [Def], cache_size: int):
+        self._template = doctree.load_template()
+        doctree.generate_hrefs(defs)
+        self._pages = dict((d.page, d) for d in defs if d.page is not None)
+        self._search_files = dict((path, content.encode('utf-8'))
+                                  for path, content in search.index_files(defs).items())
+        self._sibling_cache = doctree.SiblingCache()
+        self.page = functools.lru_cache(maxsize=cache_size)(self._render_page)
+
+    def _render_page(self, page: str) -> Optional[bytes]:
+        try:
+            definition = self._pages[page]
+        except KeyError:
+            return None
+        return doctree.render_content(self._template, doctree.prepare_render(
+            definition, sibling_cache=self._sibling_cache)).encode('utf-8')
+
+    def search_file(self, path: str) -> Optional[bytes]:
+        return self._search_files.get(path)
+
+    def asset(self, path: str) -> Optional[bytes]:
+        resource = importlib.resources.files('doxyfront') / 'assets'
+        for part in path.split('/'):
+            resource = resource / part
+        if not resource.is_file():
+            return None
+        return resource.read_bytes()
+
+    def get(self, path: str) -> Optional[bytes]:
+        if path.endswith('.html'):
+            return self.page(path)
+        return self.search_file(path) or self.asset(path)
+
+
+class _ArchiveSite:
+    # Serves a site previously written by doctree.doctree_archive()
+    def __init__(self, file_name: str):
+        self._reader = archive.ArchiveReader(file_name)
+
+    def get(self, path: str) -> Optional[bytes]:
+        return self._reader.read(path)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def __init__(self, site, *args, **kwargs):
+        self._site = site
+        super().__init__(*args, **kwargs)
+
+    def _respond(self, with_body: bool):
+        path = posixpath.normpath(unquote(urlsplit(self.path).path)).lstrip('/')
+        if path in ('', '.'):
+            path = 'index.html'
+
+        content = None
+        if not path.startswith('..'):
+            content = self._site.get(path)
+        if content is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', mimetypes.guess_type(path)[0] or 'application/octet-stream')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if with_body:
+            self.wfile.write(content)
+
+    def do_GET(self):
+        self._respond(True)
+
+    def do_HEAD(self):
+        self._respond(False)
+
+
+def _serve(site, host: str, port: int):
+    server = HTTPServer((host, port), functools.partial(_Handler, site))
+    print('Serving on http://{}:{}/'.format(host, server.server_port), file=sys.stderr)
+    with server:
+        server.serve_forever()
+
+
+def serve(defs: [Def], host: str = 'localhost', port: int = 8000, cache_size: int = 1024):
+    # Pages are rendered lazily on first request instead of writing the whole site up front
+    _serve(_Site(defs, cache_size), host, port)
+
+
+def serve_archive(file_name: str, host: str = 'localhost', port: int = 8000):
+    _serve(_ArchiveSite(file_name), host, port)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser('doxyfront.server')
+    parser.add_argument('xml-dir', nargs='?')
+    parser.add_argument('--cache-dir', help='reuse parsed XML files from this directory across runs')
+    parser.add_argument('--load-model', metavar='FILE', help='load the model from a snapshot instead of XML')
+    parser.add_argument('--archive', metavar='FILE', help='serve a site archive written by doxyfront --archive')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--cache-pages', type=int, default=1024, help='number of rendered pages to keep')
+    args = parser.parse_args()
+
+    xml_dir = args.__dict__['xml-dir']
+    if args.archive is not None:
+        try:
+            serve_archive(args.archive, host=args.host, port=args.port)
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
+    if args.load_model is not None:
+        defs = snapshot.load(args.load_model)
+    elif xml_dir is not None:
+        files = [os.path.join(xml_dir, f) for f in sorted(os.listdir(xml_dir)) if f.endswith('.xml')]
+        defs = source.load(files, cache_dir=args.cache_dir)
+    else:
+        parser.error('either xml-dir or --load-model is required')
+
+    try:
+        serve(defs, host=args.host, port=args.port, cache_size=args.cache_pages)
+    except KeyboardInterrupt:
+        pass
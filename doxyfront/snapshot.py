@@ -0,0 +1,69 @@
+import gc
+import pickle
+from typing import Dict
+
+from .model import *
+
+# Bump whenever the model classes change in a way that breaks loading older snapshots
+_SNAPSHOT_VERSION = 4
+
+
+class _Missing:
+    pass
+
+
+def _def_state(d: Def) -> tuple:
+    # Private slots only hold caches derived from the public state
+    return tuple(None if n.startswith('_') else getattr(d, n, _Missing) for n in slot_names(type(d)))
+
+
+class _Pickler(pickle.Pickler):
+    def __init__(self, file, keys: Dict[Def, int]):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self._keys = keys
+
+    def persistent_id(self, obj):
+        # Defs are stored once in a flat table and referenced by index everywhere else, which keeps
+        # pickling depth bounded by the markup nesting instead of by the length of reference chains.
+        if isinstance(obj, Def):
+            return self._keys[obj]
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file, defs: [Def]):
+        super().__init__(file)
+        self._defs = defs
+
+    def persistent_load(self, pid):
+        return self._defs[pid]
+
+
+def save(defs: [Def], file_name: str):
+    keys = dict((d, i) for i, d in enumerate(defs))
+    with open(file_name, 'wb') as f:
+        pickle.dump((_SNAPSHOT_VERSION, [type(d) for d in defs]), f, pickle.HIGHEST_PROTOCOL)
+        _Pickler(f, keys).dump([_def_state(d) for d in defs])
+
+
+def load(file_name: str) -> [Def]:
+    with open(file_name, 'rb') as f:
+        version, classes = pickle.load(f)
+        if version != _SNAPSHOT_VERSION:
+            raise ValueError('{}: Unsupported snapshot version {}'.format(file_name, version))
+        defs = [cls.__new__(cls) for cls in classes]
+        # Unpickling allocates millions of container objects, each of which would otherwise trigger
+        # (useless) cyclic garbage collection passes over the growing heap
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            states = _Unpickler(f, defs).load()
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    for d, state in zip(defs, states):
+        for name, value in zip(slot_names(type(d)), state):
+            if value is not _Missing:
+                setattr(d, name, value)
+    return defs
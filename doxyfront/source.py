@@ -1,8 +1,15 @@
 import xml.etree.ElementTree as xml
+import functools
+import gc
+import hashlib
+import json
 import multiprocessing
+import os
+import pickle
 from typing import Dict, Optional, Set
 
 from .model import *
+from . import profiling
 
 _SUPERFLUOUS_WHITESPACE_RE = re.compile(r'(^\s+)|(?<=[\s(])\s+|\s+(?=[.,)])|(\s+$)')
 _NON_URL_RE = re.compile(r'[^a-z0-9]+')
@@ -30,10 +37,19 @@ def _maybe_lineno(attrs: Dict[str, int], key: str) -> Optional[int]:
 class Parser:
     def __init__(self, file_name: str):
         self._file_name = file_name
+        # memberdefs deserialized (and cleared) while streaming, consumed by _deserialize_compound
+        self._parsed_members: Dict[xml.Element, (Optional[Def], [Def])] = {}
+        self._strings: Dict[str, str] = {}
 
     def _warning(self, msg: str):
         print('{}: {}'.format(self._file_name, msg), file=sys.stderr)
 
+    def _intern(self, string: Optional[str]) -> Optional[str]:
+        # Repeated strings share one object, so they are serialized only once per slice
+        if string is None:
+            return None
+        return self._strings.setdefault(string, string)
+
     def _require_attr(self, attrs: Dict[str, str], key: str) -> Optional[str]:
         try:
             return attrs[key]
@@ -59,7 +75,7 @@ class Parser:
         if node.text:
             node_text = node.text.strip()
             if node_text:
-                instance.children.append(TextFragment(node_text))
+                instance.children.append(TextFragment(self._intern(node_text)))
 
         for child in node:
             fragment = None
@@ -91,7 +107,7 @@ class Parser:
             if child.tail:
                 child_tail = child.tail.strip()
                 if child_tail:
-                    instance.children.append(TextFragment(child_tail))
+                    instance.children.append(TextFragment(self._intern(child_tail)))
 
         return instance
 
@@ -101,12 +117,12 @@ class Parser:
         if node.tail:
             node_tail = node.tail.strip()
             if node_tail:
-                instance.root.children.append(TextFragment(node_tail))
+                instance.root.children.append(TextFragment(self._intern(node_tail)))
         return instance
 
     def _deserialize_location(self, node: xml.Element) -> Optional['Location']:
         instance = Location()
-        instance.file = self._require_attr(node.attrib, 'file')
+        instance.file = self._intern(self._require_attr(node.attrib, 'file'))
         instance.line = _maybe_lineno(node.attrib, 'line')
         return instance
 
@@ -165,8 +181,8 @@ class Parser:
         return instance
 
     def _deserialize_ref(self, root: xml.Element) -> Optional[Ref]:
-        id = root.attrib.get('refid')
-        name = _maybe_text(root)
+        id = self._intern(root.attrib.get('refid'))
+        name = self._intern(_maybe_text(root))
         if id is None:
             if name is None:
                 return None
@@ -253,7 +269,7 @@ class Parser:
         instance: PropertyDef = self._deserialize_def(PropertyDef, root)
         for elem in root:
             if elem.tag == 'type':
-                instance.return_type = self._deserialize_markup(elem)
+                instance.type = self._deserialize_markup(elem)
         return instance
 
     def _deserialize_enum_variant(self, root: xml.Element):
@@ -290,6 +306,29 @@ class Parser:
         instance.visibility = None
         return instance
 
+    def _deserialize_member(self, member: xml.Element) -> (Optional[Def], [Def]):
+        child = None
+        nested_defs = []
+
+        if member.attrib['kind'] == 'define':
+            child = self._deserialize_macro_def(member)
+        elif member.attrib['kind'] == 'typedef':
+            child = self._deserialize_typedef(member)
+        elif member.attrib['kind'] in ['function', 'signal', 'slot']:
+            child = self._deserialize_function(member)
+        elif member.attrib['kind'] == 'variable':
+            child = self._deserialize_variable(member)
+        elif member.attrib['kind'] == 'property':
+            child = self._deserialize_property(member)
+        elif member.attrib['kind'] == 'enum':
+            child, nested_defs = self._deserialize_enum(member)
+        elif member.attrib['kind'] == 'friend':
+            child = self._deserialize_friend(member)
+        else:
+            self._warning('Unknown member kind ' + member.attrib['kind'])
+
+        return child, nested_defs
+
     def _deserialize_compound(self, cls, root: xml.Element) -> (CompoundDef, [Def]):
         instance: cls = self._deserialize_def(cls, root)
         defs: [Def] = [instance]
@@ -301,25 +340,10 @@ class Parser:
                 instance.members.append(self._deserialize_ref(elem))
             elif elem.tag == 'sectiondef':
                 for member in elem.findall('memberdef'):
-                    child = None
-                    nested_defs = []
-
-                    if member.attrib['kind'] == 'define':
-                        child = self._deserialize_macro_def(member)
-                    elif member.attrib['kind'] == 'typedef':
-                        child = self._deserialize_typedef(member)
-                    elif member.attrib['kind'] in ['function', 'signal', 'slot']:
-                        child = self._deserialize_function(member)
-                    elif member.attrib['kind'] == 'variable':
-                        child = self._deserialize_variable(member)
-                    elif member.attrib['kind'] == 'property':
-                        child = self._deserialize_property(member)
-                    elif member.attrib['kind'] == 'enum':
-                        child, nested_defs = self._deserialize_enum(member)
-                    elif member.attrib['kind'] == 'friend':
-                        child = self._deserialize_friend(member)
-                    else:
-                        self._warning('Unknown member kind ' + member.attrib['kind'])
+                    parsed = self._parsed_members.pop(member, None)
+                    if parsed is None:
+                        parsed = self._deserialize_member(member)
+                    child, nested_defs = parsed
 
                     if child is not None:
                         defs.append(child)
@@ -377,15 +401,33 @@ class Parser:
 
         return klass, defs
 
+    def _stream_compound(self, f) -> Optional[xml.Element]:
+        # Deserializes each <memberdef> as soon as it is complete and drops its subtree, so that only
+        # the (small) compound-level elements are held in memory until the whole document is read.
+        compound = None
+        path = []
+        for event, elem in xml.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                if len(path) == 1 and elem.tag == 'compounddef' and compound is None:
+                    compound = elem
+                path.append(elem)
+                continue
+
+            path.pop()
+            if elem.tag == 'memberdef' and len(path) == 3 and path[1] is compound \
+                    and path[2].tag == 'sectiondef':
+                self._parsed_members[elem] = self._deserialize_member(elem)
+                elem.clear()
+        return compound
+
     def parse(self) -> [Def]:
-        with open(self._file_name) as f:
+        with open(self._file_name, 'rb') as f:
             try:
-                tree = xml.parse(f)
+                node = self._stream_compound(f)
             except xml.ParseError as e:
                 self._warning(str(e))
                 return []
 
-        node = tree.getroot().find('compounddef')
         if node is None:
             self._warning('No compounddef in file')
             return []
@@ -435,14 +477,25 @@ def _assign_roots(d: Def, scope_root: IndexDef, file_root: IndexDef):
         file_root.members.append(ResolvedRef(d))
 
 
-def _unqualify_names(d: Def, prefix: str = ''):
-    if prefix and d.qualified_name.startswith(prefix):
-        d.name = d.qualified_name[len(prefix):]
-    if (not prefix or d.qualified_name.startswith(prefix)) and isinstance(d, CompoundDef):
-        prefix = d.qualified_name + '::'
-        for m in d.members:
-            if isinstance(m, ResolvedRef):
-                _unqualify_names(m.definition, prefix)
+def _unqualify_names(defs: [Def]):
+    # A def is named relative to the innermost compound listing it as a member whose qualified name
+    # prefixes its own. Looking at every parent -> member edge once keeps this linear in the model
+    # size, however deeply scopes are nested.
+    prefixes = dict()
+    for d in defs:
+        if isinstance(d, CompoundDef):
+            prefix = d.qualified_name + '::'
+            for m in d.members:
+                if isinstance(m, ResolvedRef) and m.definition.qualified_name.startswith(prefix) \
+                        and len(prefix) > len(prefixes.get(m.definition, '')):
+                    prefixes[m.definition] = prefix
+
+    for d in defs:
+        prefix = prefixes.get(d)
+        if prefix is not None:
+            d.name = d.qualified_name[len(prefix):]
+        elif d.name is None:
+            d.name = d.qualified_name
 
 
 def _derive_brief_description(d: Def):
@@ -454,48 +507,168 @@ def _derive_brief_description(d: Def):
             d.brief_description.root.children.append(fragments[0])
 
 
-def _renew_ids(defs: [Def]):
+def _is_id_for_slug(id: str, slug: str) -> bool:
+    return id == slug or (id.startswith(slug + '-') and id[len(slug) + 1:].isdigit())
+
+
+def _renew_ids(defs: [Def], id_map: Optional[Dict[str, str]] = None):
+    for d in defs:
+        d.refid = d.id
+    slugs = [(d, d.slug()[:50]) for d in sorted(defs, key=lambda d: d.refid)]
+
+    # Ids from a previous build are kept as long as they still fit the def's slug, so that URLs do not
+    # shift when defs sharing a slug are added or removed
     used = set()
-    for d in sorted(defs, key=lambda d: d.id):
-        slug = d.slug()[:50]
-        id = slug
-        i = 0
+    fresh = slugs
+    if id_map:
+        fresh = []
+        for d, slug in slugs:
+            id = id_map.get(d.refid)
+            if id is not None and id not in used and _is_id_for_slug(id, slug):
+                d.id = id
+                used.add(id)
+            else:
+                fresh.append((d, slug))
+
+    # Every other def gets the first free id of slug, slug-1, slug-2, ... Probing resumes after the
+    # last suffix handed out for the same slug, which keeps this linear for thousands of overloads.
+    next_suffix = dict()
+    for d, slug in fresh:
+        i = next_suffix.get(slug, 0)
+        id = '{}-{}'.format(slug, i) if i else slug
         while id in used:
             i += 1
             id = '{}-{}'.format(slug, i)
+        next_suffix[slug] = i + 1
         d.id = id
         used.add(id)
 
 
-def _parse_one(file_name: str) -> [Def]:
-    return Parser(file_name).parse()
+def load_id_map(file_name: str) -> Dict[str, str]:
+    try:
+        with open(file_name) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return dict()
 
 
-def load(files: [str]) -> [Def]:
-    with multiprocessing.Pool() as pool:
-        def_slices = pool.map(_parse_one, files)
+def save_id_map(defs: [Def], file_name: str):
+    id_map = dict((d.refid, d.id) for d in defs if d.refid is not None)
+    temp_file = file_name + '.tmp'
+    with open(temp_file, 'w') as f:
+        json.dump(id_map, f, indent=0, sort_keys=True)
+    os.replace(temp_file, file_name)
 
-    defs = [d for slice in def_slices for d in slice]
-    _resolve_refs(defs)
 
-    for d in defs:
-        _assign_parents(d)
+# Bump whenever the parser output or the model classes change in a way that invalidates cached slices
+_CACHE_VERSION = 7
 
-    for d in defs:
-        _unqualify_names(d)
-    for d in defs:
-        if d.name is None:
-            d.name = d.qualified_name
 
-    _renew_ids(defs)
+def _file_digest(file_name: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_name, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
-    scope_root = IndexDef('index', 'Global Namespace')
-    file_root = IndexDef('file_index', 'Root Folder')
-    for d in defs:
-        _assign_roots(d, scope_root, file_root)
-    defs += [scope_root, file_root]
 
-    for d in defs:
-        _derive_brief_description(d)
+def _cache_path(cache_dir: str, file_name: str) -> str:
+    key = hashlib.sha256(os.path.abspath(file_name).encode()).hexdigest()
+    return os.path.join(cache_dir, key + '.pickle')
+
+
+def _load_cached(cache_file: str, digest: str) -> Optional[bytes]:
+    try:
+        with open(cache_file, 'rb') as f:
+            version, cached_digest, data = pickle.load(f)
+    except Exception:
+        return None
+    if version != _CACHE_VERSION or cached_digest != digest:
+        return None
+    return data
+
+
+def _store_cached(cache_file: str, digest: str, data: bytes):
+    temp_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+    try:
+        with open(temp_file, 'wb') as f:
+            pickle.dump((_CACHE_VERSION, digest, data), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, cache_file)
+    except OSError as e:
+        print('{}: Cannot write cache entry: {}'.format(cache_file, e), file=sys.stderr)
+
+
+def _encode_slice(defs: [Def]) -> bytes:
+    return pickle.dumps(defs, pickle.HIGHEST_PROTOCOL)
+
+
+def decode_slices(slices) -> [Def]:
+    # Rebuilding the parsed objects allocates millions of containers, each of which would otherwise
+    # trigger (useless) cyclic garbage collection passes over the growing heap
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return [d for data in slices for d in pickle.loads(data)]
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def _parse_one(file_name: str, cache_dir: Optional[str] = None) -> bytes:
+    # Workers hand back pre-serialized slices: the pool then only transfers a flat bytes object, and
+    # cache hits are returned without ever being deserialized in the worker.
+    if cache_dir is None:
+        return _encode_slice(Parser(file_name).parse())
+
+    digest = _file_digest(file_name)
+    cache_file = _cache_path(cache_dir, file_name)
+    data = _load_cached(cache_file, digest)
+    if data is None:
+        data = _encode_slice(Parser(file_name).parse())
+        _store_cached(cache_file, digest, data)
+    return data
+
+
+def parse_slices(pool: multiprocessing.Pool, files: [str], cache_dir: Optional[str] = None):
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    chunksize = max(1, len(files) // (4 * (os.cpu_count() or 1)))
+    return pool.imap(functools.partial(_parse_one, cache_dir=cache_dir), files, chunksize)
+
+
+def parse(files: [str], cache_dir: Optional[str] = None) -> [Def]:
+    with profiling.stage('parse', len(files)), multiprocessing.Pool() as pool:
+        return decode_slices(parse_slices(pool, files, cache_dir))
+
+
+def link(defs: [Def], id_map: Optional[Dict[str, str]] = None) -> [Def]:
+    with profiling.stage('resolve_refs', len(defs)):
+        _resolve_refs(defs)
+
+    with profiling.stage('assign_parents', len(defs)):
+        for d in defs:
+            _assign_parents(d)
+
+    with profiling.stage('unqualify_names', len(defs)):
+        _unqualify_names(defs)
+
+    with profiling.stage('renew_ids', len(defs)):
+        _renew_ids(defs, id_map)
+
+    with profiling.stage('assign_roots', len(defs)):
+        scope_root = IndexDef('index', 'Global Namespace')
+        file_root = IndexDef('file_index', 'Root Folder')
+        for d in defs:
+            _assign_roots(d, scope_root, file_root)
+        defs += [scope_root, file_root]
+
+    with profiling.stage('derive_brief_description', len(defs)):
+        for d in defs:
+            _derive_brief_description(d)
 
     return defs
+
+
+def load(files: [str], cache_dir: Optional[str] = None, id_map: Optional[Dict[str, str]] = None) -> [Def]:
+    return link(parse(files, cache_dir), id_map)
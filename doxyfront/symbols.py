@@ -0,0 +1,67 @@
+import bisect
+from collections import defaultdict
+
+from .model import *
+
+
+def full_name(d: Def) -> str:
+    if isinstance(d, PathDef):
+        return d.path_plaintext()
+    return d.qualified_name_plaintext(set())
+
+
+class SymbolIndex:
+    # Built once from a linked model. Lookups by refid, id, name and kind are hash lookups, lookups by
+    # qualified name prefix bisect a sorted list of full names.
+    def __init__(self, defs: [Def]):
+        self._by_refid = dict()
+        self._by_id = dict()
+        self._by_name = defaultdict(list)
+        self._by_kind = defaultdict(list)
+        named = []
+        for d in defs:
+            if d.refid is not None:
+                self._by_refid[d.refid] = d
+            self._by_id[d.id] = d
+            if isinstance(d, IndexDef):
+                continue
+            self._by_name[d.name].append(d)
+            self._by_kind[d.kind()].append(d)
+            named.append((full_name(d), d))
+        named.sort(key=lambda n: n[0])
+        self._full_names = [n for n, _ in named]
+        self._sorted_defs = [d for _, d in named]
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def by_refid(self, refid: str) -> Optional[Def]:
+        return self._by_refid.get(refid)
+
+    def by_id(self, id: str) -> Optional[Def]:
+        return self._by_id.get(id)
+
+    def by_name(self, name: str) -> [Def]:
+        # All defs with this unqualified name, e.g. every overload of a function
+        return self._by_name.get(name, [])
+
+    def by_kind(self, kind: str) -> [Def]:
+        return self._by_kind.get(kind, [])
+
+    def by_qualified_name(self, qualified_name: str) -> [Def]:
+        lo = bisect.bisect_left(self._full_names, qualified_name)
+        hi = bisect.bisect_right(self._full_names, qualified_name, lo)
+        return self._sorted_defs[lo:hi]
+
+    def with_prefix(self, prefix: str) -> [Def]:
+        if not prefix:
+            return list(self._sorted_defs)
+        lo = bisect.bisect_left(self._full_names, prefix)
+        # The smallest string greater than every string starting with prefix
+        hi = bisect.bisect_left(self._full_names, prefix[:-1] + chr(ord(prefix[-1]) + 1), lo)
+        return self._sorted_defs[lo:hi]
+
+    def under(self, scope: str) -> [Def]:
+        # Everything nested (transitively) in a namespace or class, or contained in a directory. A
+        # namespace and a directory often share a name, so both are included; '/' sorts before ':'.
+        return self.with_prefix(scope + '/') + self.with_prefix(scope + '::')
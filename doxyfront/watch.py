@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+from . import source, doctree, profiling
+
+
+def _scan(xml_dir: str) -> Dict[str, tuple]:
+    stamps = dict()
+    try:
+        names = os.listdir(xml_dir)
+    except FileNotFoundError:
+        return stamps
+    for f in names:
+        if f.endswith('.xml'):
+            path = os.path.join(xml_dir, f)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            stamps[path] = (stat.st_mtime_ns, stat.st_size)
+    return stamps
+
+
+def watch(xml_dir: str, outdir: str, interval: float = 1.0, cache_dir: Optional[str] = None,
+          id_map_file: Optional[str] = None, on_rebuild: Optional[Callable[[], None]] = None,
+          **doctree_options):
+    # Parsed slices are kept in encoded form: the linked model mutates its defs, but re-decoding all
+    # slices and re-linking is cheap compared to parsing, so each change only re-parses its files.
+    # Pages that are no longer produced are removed by the incremental build.
+    slices = dict()
+    stamps = None
+    id_map = source.load_id_map(id_map_file) if id_map_file is not None else dict()
+    os.makedirs(outdir, exist_ok=True)
+    with multiprocessing.Pool() as pool:
+        while True:
+            current = _scan(xml_dir)
+            if current != stamps:
+                changed = sorted(f for f, s in current.items() if stamps is None or stamps.get(f) != s)
+                removed = [f for f in stamps or () if f not in current]
+                if stamps is not None:
+                    print('{} files changed, {} removed'.format(len(changed), len(removed)), file=sys.stderr)
+                for f in removed:
+                    del slices[f]
+                with profiling.stage('parse', len(changed)):
+                    for f, data in zip(changed, source.parse_slices(pool, changed, cache_dir)):
+                        slices[f] = data
+                    defs = source.decode_slices(slices[f] for f in sorted(slices))
+                stamps = current
+
+                defs = source.link(defs, id_map)
+                id_map = dict((d.refid, d.id) for d in defs if d.refid is not None)
+                if id_map_file is not None:
+                    source.save_id_map(defs, id_map_file)
+                doctree.doctree(defs, outdir, incremental_state=True, **doctree_options)
+                if on_rebuild is not None:
+                    on_rebuild()
+            time.sleep(interval)
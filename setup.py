@@ -18,6 +18,9 @@ setup(
     url='https://github.com/fknorr/doxyfront',
     packages=['doxyfront'],
     install_requires=['jinja2'],
+    extras_require={
+        'brotli': ['brotli'],
+    },
     entry_points={
         'console_scripts': [
             'doxyfront=doxyfront',
@@ -0,0 +1,41 @@
+import gc
+import os
+
+from benchmarks import synthetic
+from doxyfront import doctree, source
+from doxyfront.model import Def
+
+
+def _live_defs() -> int:
+    gc.collect()
+    return sum(1 for o in gc.get_objects() if isinstance(o, Def))
+
+
+def test_repeated_builds_do_not_keep_old_models_alive(tmp_path):
+    # Like watch mode: every cycle links a fresh model and renders it, with sibling navs rendered
+    # in this process
+    xml_dir = str(tmp_path / 'xml')
+    os.makedirs(xml_dir)
+    synthetic.generate(xml_dir, namespaces=3, classes=6, members=3, depth=2)
+    files = [os.path.join(xml_dir, f) for f in sorted(os.listdir(xml_dir))]
+
+    live = []
+    for _ in range(4):
+        doctree.doctree(source.load(files), str(tmp_path / 'out'), incremental_state=True, shared_nav=True)
+        live.append(_live_defs())
+    assert live[-1] == live[0]
+
+
+def test_dropped_encodings_leave_no_stale_siblings(tmp_path):
+    xml_dir = str(tmp_path / 'xml')
+    os.makedirs(xml_dir)
+    synthetic.generate(xml_dir, namespaces=3, classes=6, members=3, depth=2)
+    files = [os.path.join(xml_dir, f) for f in sorted(os.listdir(xml_dir))]
+    out_dir = str(tmp_path / 'out')
+    doctree.doctree(source.load(files), out_dir, encodings=['gzip'])
+    assert any(f.endswith('.gz') for _, _, fs in os.walk(out_dir) for f in fs)
+
+    for skip_unchanged in (True, False):
+        doctree.doctree(source.load(files), out_dir, skip_unchanged=skip_unchanged)
+        assert not any(f.endswith('.gz') for _, _, fs in os.walk(out_dir) for f in fs)
+        doctree.doctree(source.load(files), out_dir, encodings=['gzip'])
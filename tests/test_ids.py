@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from benchmarks import synthetic
+from doxyfront import source
+
+
+@pytest.fixture
+def xml_files(tmp_path) -> [str]:
+    xml_dir = str(tmp_path / 'xml')
+    os.makedirs(xml_dir)
+    # Numbers are dropped from slugs, so most classes and methods compete for the same ids
+    synthetic.generate(xml_dir, namespaces=3, classes=12, members=4, depth=2)
+    return [os.path.join(xml_dir, f) for f in sorted(os.listdir(xml_dir))]
+
+
+def _ids(defs) -> dict:
+    return dict((d.refid, d.id) for d in defs if d.refid is not None)
+
+
+def _probed_ids(defs) -> dict:
+    # The original assignment: in refid order, the first free id of slug, slug-1, slug-2, ...
+    used = set()
+    ids = dict()
+    for d in sorted((d for d in defs if d.refid is not None), key=lambda d: d.refid):
+        slug = d.slug()[:50]
+        id = slug
+        i = 0
+        while id in used:
+            i += 1
+            id = '{}-{}'.format(slug, i)
+        ids[d.refid] = id
+        used.add(id)
+    return ids
+
+
+def test_ids_without_map_match_probing_order(xml_files):
+    defs = source.load(xml_files)
+    ids = _ids(defs)
+    assert ids == _probed_ids(defs)
+    assert len(set(ids.values())) == len(ids)
+
+
+@pytest.mark.parametrize('change', ['remove', 'add'])
+def test_id_map_keeps_unrelated_ids(xml_files, tmp_path, change):
+    changed_file = next(f for f in xml_files if os.path.basename(f) == 'classns0_1_1Class3.xml')
+    reduced = [f for f in xml_files if f != changed_file]
+    before_files, after_files = (xml_files, reduced) if change == 'remove' else (reduced, xml_files)
+
+    map_file = str(tmp_path / 'ids.json')
+    before = source.load(before_files)
+    source.save_id_map(before, map_file)
+    before_ids = _ids(before)
+
+    after_ids = _ids(source.load(after_files, id_map=source.load_id_map(map_file)))
+    common = before_ids.keys() & after_ids.keys()
+    assert all(after_ids[r] == before_ids[r] for r in common)
+    assert len(set(after_ids.values())) == len(after_ids)
+
+    # Without the map, the change shifts the suffixes of other defs sharing a slug
+    unmapped_ids = _ids(source.load(after_files))
+    assert any(unmapped_ids[r] != before_ids[r] for r in common)
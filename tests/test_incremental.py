@@ -0,0 +1,43 @@
+import filecmp
+import os
+
+from benchmarks import synthetic
+from doxyfront import doctree, source
+
+
+def _build(xml_dir: str, out_dir: str, **options):
+    files = [os.path.join(xml_dir, f) for f in sorted(os.listdir(xml_dir)) if f.endswith('.xml')]
+    doctree.doctree(source.load(files), out_dir, **options)
+
+
+def _listing(out_dir: str) -> [str]:
+    return sorted(os.path.relpath(os.path.join(root, f), out_dir)
+                  for root, _, files in os.walk(out_dir) for f in files if not f.startswith('.doxyfront'))
+
+
+def _edit(file_name: str, old: str, new: str):
+    with open(file_name) as f:
+        content = f.read()
+    assert old in content
+    with open(file_name, 'w') as f:
+        f.write(content.replace(old, new))
+
+
+def test_renamed_and_removed_pages_are_deleted(tmp_path):
+    xml_dir = str(tmp_path / 'xml')
+    os.makedirs(xml_dir)
+    synthetic.generate(xml_dir, namespaces=3, classes=6, members=3, depth=2)
+    out_dir = str(tmp_path / 'incremental')
+    _build(xml_dir, out_dir, incremental_state=True, encodings=['gzip'])
+
+    _edit(os.path.join(xml_dir, 'classns2_1_1Class5.xml'), 'ns2::Class5', 'ns2::Renamed')
+    os.remove(os.path.join(xml_dir, 'classns0_1_1Class3.xml'))
+    _build(xml_dir, out_dir, incremental_state=True, encodings=['gzip'])
+
+    full_dir = str(tmp_path / 'full')
+    _build(xml_dir, full_dir, encodings=['gzip'])
+    listing = _listing(full_dir)
+    assert _listing(out_dir) == listing
+    assert 'c-ns-renamed.html' in listing
+    _, mismatch, errors = filecmp.cmpfiles(out_dir, full_dir, listing, shallow=False)
+    assert mismatch == [] and errors == []
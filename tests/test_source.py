@@ -0,0 +1,85 @@
+import os
+
+from doxyfront import doctree, source
+from doxyfront.model import *
+
+_XML = '''<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<doxygen version="1.8.17" xml:lang="en-US">
+<compounddef id="classfoo" kind="class" language="C++" prot="public">
+<compoundname>foo</compoundname>
+<sectiondef kind="public-func">
+<memberdef kind="define" id="classfoo_1define" prot="public" static="no">
+<name>FOO_MACRO</name><param><defname>x</defname></param><initializer>(x) + 1</initializer>
+<location file="foo.h" line="1"/></memberdef>
+<memberdef kind="typedef" id="classfoo_1typedef" prot="public" static="no">
+<type>int</type><definition>using size = int</definition><name>size</name>
+<location file="foo.h" line="2"/></memberdef>
+<memberdef kind="function" id="classfoo_1function" prot="public" static="no" const="yes" explicit="no"
+ inline="no" virt="non-virtual">
+<type><ref refid="classfoo" kindref="compound">foo</ref> &amp;</type><name>get</name>
+<param><type>int</type><declname>i</declname><defval>0</defval></param>
+<location file="foo.h" line="3"/></memberdef>
+<memberdef kind="signal" id="classfoo_1signal" prot="public" static="no" const="no" explicit="no"
+ inline="no" virt="non-virtual">
+<type>void</type><name>changed</name><location file="foo.h" line="4"/></memberdef>
+<memberdef kind="slot" id="classfoo_1slot" prot="public" static="no" const="no" explicit="no"
+ inline="no" virt="non-virtual">
+<type>void</type><name>update</name><location file="foo.h" line="5"/></memberdef>
+<memberdef kind="variable" id="classfoo_1variable" prot="public" static="no" mutable="no">
+<type>int</type><name>count</name><initializer>= 0</initializer><location file="foo.h" line="6"/></memberdef>
+<memberdef kind="property" id="classfoo_1property" prot="public" static="no" readable="yes" writable="no">
+<type><ref refid="classfoo" kindref="compound">foo</ref></type><name>bar</name>
+<location file="foo.h" line="7"/></memberdef>
+<memberdef kind="enum" id="classfoo_1enum" prot="public" static="no" strong="yes">
+<type>int</type><name>mode</name>
+<enumvalue id="classfoo_1enum_value" prot="public"><name>fast</name><initializer>= 1</initializer></enumvalue>
+<location file="foo.h" line="8"/></memberdef>
+<memberdef kind="friend" id="classfoo_1friend" prot="public" static="no" const="no" explicit="no"
+ inline="no" virt="non-virtual">
+<type>class</type><definition>friend class other</definition><name>other</name>
+<location file="foo.h" line="9"/></memberdef>
+</sectiondef>
+<location file="foo.h" line="1"/>
+</compounddef>
+</doxygen>
+'''
+
+
+def _write_xml(tmp_path) -> str:
+    file_name = str(tmp_path / 'classfoo.xml')
+    with open(file_name, 'w') as f:
+        f.write(_XML)
+    return file_name
+
+
+def test_every_member_kind_is_parsed(tmp_path):
+    defs = source.Parser(_write_xml(tmp_path)).parse()
+    by_name = dict((d.qualified_name, d) for d in defs)
+    assert dict((n, d.kind()) for n, d in by_name.items()) == {
+        'foo': 'class',
+        'FOO_MACRO': 'macro',
+        'size': 'typedef',
+        'get': 'function',
+        'changed': 'signal',
+        'update': 'slot',
+        'count': 'variable',
+        'bar': 'property',
+        'mode': 'enum',
+        'fast': 'enum-variant',
+        'other': 'friend',
+    }
+    assert isinstance(by_name['bar'].type, Markup)
+    assert len(by_name['get'].parameters) == 1
+    assert by_name['mode'].members[0].definition is by_name['fast']
+    assert len(by_name['foo'].members) == 9
+
+
+def test_every_member_kind_is_rendered(tmp_path):
+    defs = source.load([_write_xml(tmp_path)])
+    bar = next(d for d in defs if d.name == 'bar')
+    # The property's type refers back to its class
+    assert isinstance(next(f for f in bar.type.root.children if isinstance(f, RefFragment)).ref, ResolvedRef)
+
+    out_dir = str(tmp_path / 'out')
+    doctree.doctree(defs, out_dir)
+    assert os.path.exists(os.path.join(out_dir, bar.page))
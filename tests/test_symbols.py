@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from benchmarks import synthetic
+from doxyfront import source
+from doxyfront.symbols import SymbolIndex, full_name
+
+
+@pytest.fixture(scope='module')
+def index(tmp_path_factory) -> SymbolIndex:
+    xml_dir = str(tmp_path_factory.mktemp('xml'))
+    synthetic.generate(xml_dir, namespaces=3, classes=6, members=3, depth=2, unresolved_rate=0)
+    return SymbolIndex(source.load([os.path.join(xml_dir, f) for f in sorted(os.listdir(xml_dir))]))
+
+
+def _names(defs) -> [str]:
+    return [full_name(d) for d in defs]
+
+
+def test_by_refid(index):
+    d = index.by_refid('classns0_1_1Class3')
+    assert full_name(d) == 'ns0::Class3'
+    assert index.by_id(d.id) is d
+    assert index.by_refid('classns0_1_1Missing') is None
+
+
+def test_by_name(index):
+    assert _names(index.by_name('Class3')) == ['ns0::Class3']
+    # Overloads share their name
+    overloads = index.by_name('method0')
+    assert len(overloads) == 12
+    assert all(d.kind() == 'function' for d in overloads)
+    assert index.by_name('missing') == []
+
+
+def test_with_prefix(index):
+    names = _names(index.with_prefix('ns0::ns1::Class'))
+    assert names == sorted(names)
+    assert set(names) == {'ns0::ns1::Class1', 'ns0::ns1::Class1::method0', 'ns0::ns1::Class1::method1',
+                          'ns0::ns1::Class4', 'ns0::ns1::Class4::method0', 'ns0::ns1::Class4::method1'}
+    assert index.with_prefix('ns0::ns1::Class9') == []
+    assert len(index.with_prefix('')) == len(index) - 2
+
+
+def test_under_includes_namespace_and_directory(index):
+    # ns0 is both a namespace and a directory
+    assert {d.kind() for d in index.by_qualified_name('ns0')} == {'namespace', 'directory'}
+    under = index.under('ns0')
+    names = _names(under)
+    assert names == sorted(names)
+    assert 'ns0::Class0' in names and 'ns0::ns1::Class1::method0' in names
+    assert 'ns0/class0.h' in names
+    assert not any(n.startswith('ns2') or n == 'ns0' for n in names)
+    assert _names(index.under('ns0::Class0')) == ['ns0::Class0::method0'] * 2 + ['ns0::Class0::method1']
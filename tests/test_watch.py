@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from benchmarks import synthetic
+from doxyfront import doctree, source, watch
+
+
+class _Stop(Exception):
+    pass
+
+
+def _run(monkeypatch, xml_dir: str, out_dir: str, steps: list):
+    # Runs one poll per step, calling each step in place of the sleep after its poll
+    steps = iter(steps)
+
+    def sleep(_):
+        step = next(steps, None)
+        if step is None:
+            raise _Stop()
+        step()
+
+    monkeypatch.setattr(watch.time, 'sleep', sleep)
+    with pytest.raises(_Stop):
+        watch.watch(xml_dir, out_dir, interval=0)
+
+
+def _pages(out_dir: str) -> [str]:
+    return sorted(f for f in os.listdir(out_dir) if f.endswith('.html'))
+
+
+def test_removed_files_prune_pages(monkeypatch, tmp_path):
+    xml_dir = str(tmp_path / 'xml')
+    os.makedirs(xml_dir)
+    synthetic.generate(xml_dir, namespaces=3, classes=6, members=3, depth=2)
+    out_dir = str(tmp_path / 'out')
+    _run(monkeypatch, xml_dir, out_dir, [lambda: os.remove(os.path.join(xml_dir, 'classns0_1_1Class3.xml'))])
+
+    full_dir = str(tmp_path / 'full')
+    files = [os.path.join(xml_dir, f) for f in sorted(os.listdir(xml_dir))]
+    doctree.doctree(source.load(files), full_dir)
+    # Watch mode keeps ids stable across rebuilds, so only the number of pages matches a clean build
+    assert len(_pages(out_dir)) == len(_pages(full_dir))
+
+
+def test_unchanged_input_is_not_rebuilt(monkeypatch, tmp_path):
+    builds = []
+    monkeypatch.setattr(watch.doctree, 'doctree', lambda *args, **kwargs: builds.append(args))
+    for xml_dir in (tmp_path / 'empty', tmp_path / 'missing'):
+        builds.clear()
+        if xml_dir.name == 'empty':
+            os.makedirs(str(xml_dir))
+        _run(monkeypatch, str(xml_dir), str(tmp_path / 'out'), [lambda: None] * 3)
+        assert len(builds) == 1